@@ -287,6 +287,7 @@ const Customers = () => {
   const [keyword, setKeyword] = useState('');
   const [currentPage, setCurrentPage] = useState(1);
   const [customersPerPage] = useState(20);
+  const [totalCustomers, setTotalCustomers] = useState(0);
   const [formData, setFormData] = useState({
     store_id: '',
     first_name: '',
@@ -312,8 +313,10 @@ const Customers = () => {
 
   const fetchCustomers = async () => {
     try {
-      const response = await axios.get(`http://localhost:5000/customers?page=${currentPage}&limit=${customersPerPage}`);
+      // The server returns one page at a time, plus the total for the page buttons
+      const response = await axios.get(`http://localhost:5000/customers?page=${currentPage}&limit=${customersPerPage}&count=true`);
       setCustomerData(response.data.customers);
+      setTotalCustomers(response.data.total);
     } catch (error) {
       console.error('Error fetching customers:', error);
     }
@@ -328,6 +331,8 @@ const Customers = () => {
     try {
       const response = await axios.get(`http://localhost:5000/search/customers?keyword=${keyword}`);
       setCustomerData(response.data);
+      // Search results come back as one list, so there are no pages to offer
+      setTotalCustomers(0);
     } catch (error) {
       console.error('Error searching for customers:', error);
     }
@@ -448,9 +453,7 @@ const handleReturnMovie = async (rentalId) => {
     }
   };
 
-  const indexOfLastCustomer = currentPage * customersPerPage;
-  const indexOfFirstCustomer = indexOfLastCustomer - customersPerPage;
-  const currentCustomers = customerData.slice(indexOfFirstCustomer, indexOfLastCustomer);
+  const currentCustomers = customerData;
 
   return (
     <div>
@@ -574,7 +577,7 @@ const handleReturnMovie = async (rentalId) => {
                 </tbody>
               </table>
               <ul className="page">
-                {Array.from({ length: Math.ceil(customerData.length / customersPerPage) }, (_, i) => (
+                {Array.from({ length: Math.ceil(totalCustomers / customersPerPage) }, (_, i) => (
                   <li key={i} onClick={() => paginate(i + 1)}>
                     {i + 1}
                   </li>
@@ -0,0 +1,440 @@
+# ASGI entry point: the read-heavy endpoints on SQLAlchemy's asyncio extension, the rest via the Flask app
+import asyncio
+import io
+import logging
+import re
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qsl
+
+from sqlalchemy import func
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from werkzeug.datastructures import MIMEAccept, MultiDict
+from werkzeug.http import parse_accept_header
+
+import server
+from config import engine_options
+from fieldsets import InvalidFields
+from routing import READ_METHODS, STICKY_COOKIE
+from streaming import NDJSON_MIMETYPE
+
+log = logging.getLogger('sakila.async')
+
+# Async DBAPI used in place of each backend's default sync driver
+ASYNC_DRIVERS = {'mysql': 'aiomysql', 'sqlite': 'aiosqlite', 'postgresql': 'asyncpg'}
+
+# Chunks a WSGI response thread may buffer ahead of a slow client
+WSGI_QUEUE_CHUNKS = 8
+
+
+def async_url(url):
+    url = make_url(url)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f'No async driver configured for {backend}')
+    return url.set(drivername=f'{backend}+{ASYNC_DRIVERS[backend]}')
+
+
+def request_args(scope):
+    return MultiDict(parse_qsl(scope['query_string'].decode('latin-1'), keep_blank_values=True))
+
+
+def request_headers(scope):
+    headers = {}
+    for name, value in scope['headers']:
+        name = name.decode('latin-1').lower()
+        value = value.decode('latin-1')
+        headers[name] = f'{headers[name]}, {value}' if name in headers else value
+    return headers
+
+
+def wants_stream(args, headers):
+    # Same test as streaming.wants_stream; streamed bodies stay on the WSGI path
+    accept = parse_accept_header(headers.get('accept'), MIMEAccept)
+    if accept.best_match(['application/json', NDJSON_MIMETYPE]) == NDJSON_MIMETYPE:
+        return True
+    return args.get('stream', '').lower() in ('1', 'true', 'yes')
+
+
+def sticky(headers):
+    for part in headers.get('cookie', '').split(';'):
+        name, _, value = part.strip().partition('=')
+        if name == STICKY_COOKIE:
+            try:
+                return float(value) > time.time()
+            except ValueError:
+                return False
+    return False
+
+
+def wsgi_environ(scope, body):
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode().decode('latin-1'),
+        'PATH_INFO': scope['path'].encode().decode('latin-1'),
+        'QUERY_STRING': scope['query_string'].decode('latin-1'),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    host, port = scope.get('server') or ('localhost', 80)
+    environ['SERVER_NAME'] = host
+    environ['SERVER_PORT'] = str(port)
+    if scope.get('client'):
+        environ['REMOTE_ADDR'] = scope['client'][0]
+    for name, value in request_headers(scope).items():
+        name = name.upper().replace('-', '_')
+        environ[name if name in ('CONTENT_TYPE', 'CONTENT_LENGTH') else f'HTTP_{name}'] = value
+    return environ
+
+
+class ClientDisconnected(Exception):
+    pass
+
+
+class AsyncReadApp:
+    """ASGI app serving the dashboard reads without a thread per request.
+
+    GET /top_movies, /top_actors, /customers, /rental_info and
+    /customers/<id>/rentals run their queries through an AsyncSession on
+    an async engine whose pool (ASYNC_POOL_SIZE + ASYNC_MAX_OVERFLOW) bounds
+    the connections every in-flight request shares; a request that can't get
+    one waits on the event loop, not in a thread. The query builders are the
+    ones server.py uses, run with session.run_sync().
+
+    Everything else, including streamed responses, goes to the Flask app on
+    a pool of ASYNC_WSGI_THREADS threads. The async handlers answer from the
+    same in-memory leaderboard and reference data as the sync views, and
+    read from the replicas unless the client holds the sticky cookie, but
+    skip the conditional GET validators, the result cache and /metrics.
+    """
+
+    def __init__(self, flask_app):
+        self.flask_app = flask_app
+        self.primary = None
+        self.replicas = []
+        self.sessions = {}
+        self.executor = None
+        self._started = None
+        self._turn = 0
+        self.routes = [
+            (re.compile(r'/top_movies'), self.top_movies),
+            (re.compile(r'/top_actors'), self.top_actors),
+            (re.compile(r'/customers'), self.customers),
+            (re.compile(r'/rental_info'), self.rental_info),
+            (re.compile(r'/customers/(?P<customer_id>\d+)/rentals'), self.customer_rentals),
+        ]
+
+    async def startup(self):
+        config = self.flask_app.config
+        with self.flask_app.app_context():
+            # Engine URLs, since Flask-SQLAlchemy resolves relative SQLite paths
+            urls = [server.db.engine.url] + [engine.url for engine in server.replica_router.replicas]
+        engines = []
+        for url in urls:
+            options = engine_options(config, url, 'ASYNC_POOL_SIZE', 'ASYNC_MAX_OVERFLOW')
+            if 'pool_size' in options:
+                options['pool_timeout'] = config['ASYNC_POOL_TIMEOUT']
+            engines.append(create_async_engine(async_url(url), **options))
+        self.primary, self.replicas = engines[0], engines[1:]
+        self.sessions = {engine: async_sessionmaker(engine, expire_on_commit=False) for engine in engines}
+        self.executor = ThreadPoolExecutor(max_workers=config['ASYNC_WSGI_THREADS'], thread_name_prefix='wsgi')
+
+    async def shutdown(self):
+        for engine in self.sessions:
+            await engine.dispose()
+        if self.executor is not None:
+            self.executor.shutdown(wait=False)
+
+    async def ensure_started(self):
+        # Servers that skip the lifespan protocol start the app on first request
+        if self._started is None:
+            self._started = asyncio.ensure_future(self.startup())
+        await self._started
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            return
+        await self.ensure_started()
+        args = request_args(scope)
+        headers = request_headers(scope)
+        if scope['method'] in READ_METHODS and not wants_stream(args, headers):
+            for pattern, handler in self.routes:
+                match = pattern.fullmatch(scope['path'])
+                if match:
+                    try:
+                        status, payload = await handler(self.session_for(headers), args, **match.groupdict())
+                    except Exception:
+                        log.exception('Error on %s', scope['path'])
+                        status, payload = 500, {'error': 'Internal Server Error'}
+                    await self.send_json(send, status, payload, scope['method'] == 'HEAD')
+                    return
+        await self.call_wsgi(scope, receive, send)
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                try:
+                    await self.ensure_started()
+                except Exception as e:
+                    await send({'type': 'lifespan.startup.failed', 'message': str(e)})
+                    return
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await self.shutdown()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    def session_for(self, headers):
+        # Replicas in turn, unless this client wrote recently (see routing.py)
+        if not self.replicas or sticky(headers):
+            return self.sessions[self.primary]
+        self._turn += 1
+        return self.sessions[self.replicas[self._turn % len(self.replicas)]]
+
+    async def send_json(self, send, status, payload, head=False):
+        body = (self.flask_app.json.dumps(payload) + '\n').encode()
+        await send({
+            'type': 'http.response.start',
+            'status': status,
+            'headers': [
+                (b'content-type', b'application/json'),
+                (b'content-length', str(len(body)).encode()),
+                # Same answer flask_cors gives the sync routes
+                (b'access-control-allow-origin', b'*'),
+            ],
+        })
+        await send({'type': 'http.response.body', 'body': b'' if head else body})
+
+    async def in_app(self, fn, *args):
+        # For the rare blocking step (a first leaderboard load, a reference data reload)
+        def call():
+            with self.flask_app.app_context():
+                return fn(*args)
+        return await asyncio.get_running_loop().run_in_executor(self.executor, call)
+
+    async def snapshot(self):
+        snapshot = server.reference_data.peek()
+        if snapshot is None:
+            snapshot = await self.in_app(server.reference_data.get)
+        return snapshot
+
+    async def leaderboard(self):
+        if not self.flask_app.config['LEADERBOARD_ENABLED']:
+            return None
+        if server.leaderboard.loaded:
+            return server.leaderboard
+        return await self.in_app(server.get_leaderboard)
+
+    async def top_movies(self, sessions, args):
+        try:
+            fields = server.FILM_FIELDS.parse(args.get('fields'))
+        except InvalidFields as e:
+            return 400, {'error': str(e)}
+        columns = server.FILM_FIELDS.columns(fields)
+        board = await self.leaderboard()
+        async with sessions() as session:
+            if board is not None:
+                top = board.top_films(5)
+                film_ids = [film_id for film_id, _ in top]
+                films = await session.run_sync(lambda sync_session: {
+                    film.film_id: film
+                    for film in sync_session.query(*columns).filter(server.Film.film_id.in_(film_ids))
+                })
+            else:
+                rows = await session.run_sync(lambda sync_session: server.top_movies_query(columns, sync_session).all())
+        snapshot = await self.snapshot()
+        if board is not None:
+            return 200, [
+                server.serialize_top_movie(films[film_id], count, fields, snapshot)
+                for film_id, count in top if film_id in films
+            ]
+        return 200, [server.serialize_top_movie(row, row.rental_count, fields, snapshot) for row in rows]
+
+    async def top_actors(self, sessions, args):
+        actor_limit = min(max(args.get('actors', 5, type=int), 1), server.TOP_ACTORS_MAX)
+        movie_limit = min(max(args.get('movies', 5, type=int), 1), server.TOP_ACTOR_MOVIES_MAX)
+        board = await self.leaderboard()
+        if board is not None:
+            return 200, board.top_actors(actor_limit, movie_limit)
+
+        def load(sync_session):
+            # Connect first so the dialect knows the server version
+            dialect = sync_session.connection().dialect
+            return server.load_top_actor_rows(actor_limit, movie_limit, sync_session, dialect)
+
+        async with sessions() as session:
+            rows = await session.run_sync(load)
+        return 200, server.group_top_actors(rows)
+
+    async def customers(self, sessions, args):
+        try:
+            limit = min(max(args.get('limit', server.CUSTOMER_PAGE_DEFAULT, type=int), 1), server.CUSTOMER_PAGE_MAX)
+            cursor = args.get('cursor')
+            page = args.get('page', type=int)
+            try:
+                fields = server.CUSTOMER_FIELDS.parse(args.get('fields'))
+            except InvalidFields as e:
+                return 400, {'error': str(e)}
+            after_id = None
+            if cursor:
+                try:
+                    after_id = server.decode_cursor(cursor)
+                except (ValueError, KeyError, TypeError):
+                    return 400, {'error': 'Invalid cursor'}
+            with_total = args.get('count', '').lower() in ('1', 'true', 'yes')
+
+            def load(sync_session):
+                query = server.customers_query(fields, sync_session)
+                if after_id is not None:
+                    query = query.filter(server.Customer.customer_id > after_id)
+                elif page and page > 1:
+                    query = query.offset((page - 1) * limit)
+                total = None
+                if with_total:
+                    total = sync_session.query(func.count(server.Customer.customer_id)).scalar()
+                return query.limit(limit + 1).all(), total
+
+            async with sessions() as session:
+                rows, total = await session.run_sync(load)
+            has_more = len(rows) > limit
+            rows = rows[:limit]
+            snapshot = await self.snapshot()
+            response = {
+                'customers': [server.serialize_customer(customer, fields, snapshot) for customer in rows],
+                'limit': limit,
+                'next_cursor': server.encode_cursor(rows[-1].customer_id) if has_more else None
+            }
+            if total is not None:
+                response['total'] = total
+            return 200, response
+        except Exception as e:
+            return 500, {'error': str(e)}
+
+    async def rental_info(self, sessions, args):
+        customer_id = args.get('customer_id')
+        if customer_id is None:
+            return 400, {'error': 'Customer ID is required'}
+        async with sessions() as session:
+            rows = await session.run_sync(lambda sync_session: server.rental_info_query(customer_id, sync_session).all())
+        if not rows:
+            return 404, {'error': 'No rental information found for the provided customer ID'}
+        return 200, [server.serialize_rental_info(row) for row in rows]
+
+    async def customer_rentals(self, sessions, args, customer_id):
+        customer_id = int(customer_id)
+        limit = min(max(args.get('limit', server.CUSTOMER_PAGE_DEFAULT, type=int), 1), server.CUSTOMER_PAGE_MAX)
+        cursor = args.get('cursor')
+        before_id = None
+        if cursor:
+            try:
+                before_id = server.decode_cursor(cursor)
+            except (ValueError, KeyError, TypeError):
+                return 400, {'error': 'Invalid cursor'}
+
+        def load(sync_session):
+            query = server.customer_rentals_query(customer_id, sync_session)
+            if before_id is not None:
+                query = query.filter(server.Rental.rental_id < before_id)
+            elif sync_session.get(server.Customer, customer_id) is None:
+                return None
+            return query.limit(limit + 1).all()
+
+        async with sessions() as session:
+            rows = await session.run_sync(load)
+        if rows is None:
+            return 404, {'error': 'Customer not found'}
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        return 200, {
+            'customer_id': customer_id,
+            'rentals': [server.serialize_customer_rental(row) for row in rows],
+            'next_cursor': server.encode_cursor(rows[-1].rental_id) if has_more else None
+        }
+
+    async def call_wsgi(self, scope, receive, send):
+        body = []
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                return
+            body.append(message.get('body', b''))
+            if not message.get('more_body'):
+                break
+        environ = wsgi_environ(scope, b''.join(body))
+
+        # The Flask app runs on a worker thread and hands its output over a
+        # bounded queue, so a streamed export is relayed as it is produced
+        loop = asyncio.get_running_loop()
+        messages = asyncio.Queue(maxsize=WSGI_QUEUE_CHUNKS)
+        state = {'closed': False, 'started': False}
+
+        def put(message):
+            if state['closed']:
+                raise ClientDisconnected()
+            asyncio.run_coroutine_threadsafe(messages.put(message), loop).result()
+
+        def start_response(status, headers, exc_info=None):
+            state['started'] = True
+            put({
+                'type': 'http.response.start',
+                'status': int(status.split(' ', 1)[0]),
+                'headers': [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers],
+            })
+            return lambda data: put({'type': 'http.response.body', 'body': data, 'more_body': True})
+
+        def run():
+            try:
+                result = self.flask_app(environ, start_response)
+                try:
+                    for data in result:
+                        if data:
+                            put({'type': 'http.response.body', 'body': data, 'more_body': True})
+                finally:
+                    if hasattr(result, 'close'):
+                        result.close()
+                put({'type': 'http.response.body', 'body': b''})
+            except ClientDisconnected:
+                pass
+            except Exception:
+                log.exception('Error on %s', scope['path'])
+                if not state['started']:
+                    put({'type': 'http.response.start', 'status': 500, 'headers': []})
+                put({'type': 'http.response.body', 'body': b''})
+
+        task = loop.run_in_executor(self.executor, run)
+        try:
+            while True:
+                message = await messages.get()
+                await send(message)
+                if message['type'] == 'http.response.body' and not message.get('more_body'):
+                    break
+        finally:
+            state['closed'] = True
+            # Unblock a put() waiting on a full queue so the thread can stop
+            while not messages.empty():
+                messages.get_nowait()
+            await task
+
+
+app = AsyncReadApp(server.app)
+
+
+# Run with an ASGI server, e.g. uvicorn async_server:app --port 5000
+if __name__ == '__main__':
+    try:
+        import uvicorn
+    except ImportError:
+        raise SystemExit('Serving the async app needs an ASGI server: pip install uvicorn')
+    uvicorn.run(app, host='127.0.0.1', port=5000)
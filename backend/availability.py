@@ -0,0 +1,88 @@
+# In-memory availability of inventory copies for /available-rent
+from bisect import bisect_right, insort
+import threading
+
+
+class InventoryAvailability:
+    """Tracks which inventory copies are currently out on rental.
+
+    Copies are kept in sorted inventory_id lists (all, per store, per film)
+    and the rented copies in a set, so listing available copies walks the
+    catalog instead of joining against the whole rental history.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.loaded = False
+        self.copies = {}
+        self.films = {}
+        self.rented = set()
+        self._all = []
+        self._by_store = {}
+        self._by_film = {}
+
+    def load(self, inventory_rows, films, rented_ids):
+        copies = {}
+        by_store = {}
+        by_film = {}
+        for inventory_id, film_id, store_id in inventory_rows:
+            copies[inventory_id] = (film_id, store_id)
+            by_store.setdefault(store_id, []).append(inventory_id)
+            by_film.setdefault(film_id, []).append(inventory_id)
+        for ids in list(by_store.values()) + list(by_film.values()):
+            ids.sort()
+
+        with self._lock:
+            self.copies = copies
+            self.films = dict(films)
+            self.rented = set(rented_ids)
+            self._all = sorted(copies)
+            self._by_store = by_store
+            self._by_film = by_film
+            self.loaded = True
+
+    def add_copy(self, inventory_id, film_id, store_id):
+        with self._lock:
+            if inventory_id in self.copies:
+                return
+            self.copies[inventory_id] = (film_id, store_id)
+            insort(self._all, inventory_id)
+            insort(self._by_store.setdefault(store_id, []), inventory_id)
+            insort(self._by_film.setdefault(film_id, []), inventory_id)
+
+    def mark_rented(self, inventory_id):
+        with self._lock:
+            self.rented.add(inventory_id)
+
+    def mark_returned(self, inventory_id):
+        with self._lock:
+            self.rented.discard(inventory_id)
+
+    def is_available(self, inventory_id):
+        with self._lock:
+            return inventory_id in self.copies and inventory_id not in self.rented
+
+    def available(self, store_id=None, film_id=None, after=None, limit=None):
+        # Returns (inventory_id, film_id, store_id) rows in inventory_id order;
+        # one row past the limit is included so callers can tell if more remain
+        with self._lock:
+            if film_id is not None:
+                ids = self._by_film.get(film_id, [])
+            elif store_id is not None:
+                ids = self._by_store.get(store_id, [])
+            else:
+                ids = self._all
+
+            start = bisect_right(ids, after) if after is not None else 0
+            rows = []
+            for index in range(start, len(ids)):
+                inventory_id = ids[index]
+                if inventory_id in self.rented:
+                    continue
+                copy_film_id, copy_store_id = self.copies[inventory_id]
+                if store_id is not None and copy_store_id != store_id:
+                    continue
+                rows.append((inventory_id, copy_film_id, copy_store_id))
+                if limit is not None and len(rows) > limit:
+                    break
+            return rows
@@ -0,0 +1,39 @@
+"""Load-test and benchmark tooling for the Flask backend.
+
+Run from the backend directory:
+
+    python -m bench.generate --url sqlite:///bench.db --scale 10
+    python -m bench.run --url sqlite:///bench.db --concurrency 8 --output before.json
+    python -m bench.report before.json after.json
+    python -m bench.plans --url sqlite:///bench.db
+    python -m bench.run --url sqlite:///bench.db --concurrency 64 --routes top customers rental --output sync.json
+    python -m bench.run --url sqlite:///bench.db --concurrency 64 --routes top customers rental --asgi --output async.json
+
+bench.plans replays each read route, EXPLAINs the SQL it sends and fails on
+a new full scan or an extra query compared to bench/plans/<dialect>.json;
+--update records the current plans as the new golden file.
+
+--asgi drives async_server.py (needs aiosqlite or aiomysql) on one event
+loop thread, against the thread-per-request test client by default; run
+both with SAKILA_RESULT_CACHE=0, since only the sync routes use the result
+cache.
+"""
+import os
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def load_server(url):
+    # server.py reads its database URI at import time
+    os.environ['SAKILA_DATABASE_URI'] = url
+    if BACKEND_DIR not in sys.path:
+        sys.path.insert(0, BACKEND_DIR)
+    import server
+    return server
+
+
+def load_async_app(url):
+    load_server(url)
+    import async_server
+    return async_server.app
@@ -0,0 +1,212 @@
+# Seeded generator for a scaled synthetic Sakila dataset
+import argparse
+import random
+from datetime import datetime, timedelta
+
+from bench import load_server
+from migrations import endpoint_indexes
+
+# Row counts of the stock Sakila database
+BASE_SIZES = {
+    'actor': 200,
+    'film': 1000,
+    'customer': 599,
+    'inventory': 4581,
+    'rental': 16044,
+}
+LANGUAGES = ['English', 'Italian', 'Japanese', 'Mandarin', 'French', 'German']
+CATEGORIES = ['Action', 'Animation', 'Children', 'Classics', 'Comedy', 'Documentary', 'Drama', 'Family',
+              'Foreign', 'Games', 'Horror', 'Music', 'New', 'Sci-Fi', 'Sports', 'Travel']
+RATINGS = ['G', 'PG', 'PG-13', 'R', 'NC-17']
+SYLLABLES = ['ka', 'ro', 'mi', 'ten', 'ash', 'vel', 'dor', 'qui', 'lan', 'zu', 'bre', 'son', 'ic', 'mar', 'eth']
+WORDS = ['ACADEMY', 'DINOSAUR', 'ACE', 'GOLDFINGER', 'ADAPTATION', 'HOLES', 'AFFAIR', 'PREJUDICE', 'AGENT',
+         'TRUMAN', 'AIRPLANE', 'SIERRA', 'ALABAMA', 'DEVIL', 'ALADDIN', 'CALENDAR', 'ALAMO', 'VIDEOTAPE',
+         'ALASKA', 'PHANTOM', 'ALI', 'FOREVER', 'ALICE', 'FANTASIA', 'ALIEN', 'CENTER', 'ALLEY', 'EVOLUTION']
+COUNTRIES = 109
+CITIES = 600
+STORES = 2
+CHUNK_SIZE = 5000
+HISTORY_START = datetime(2005, 5, 24)
+
+
+def name(rnd):
+    return ''.join(rnd.choice(SYLLABLES) for _ in range(rnd.randint(2, 3))).capitalize()
+
+
+def insert_rows(conn, table, rows):
+    # executemany in chunks so memory stays bounded at large scales
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= CHUNK_SIZE:
+            conn.execute(table.insert(), chunk)
+            chunk = []
+    if chunk:
+        conn.execute(table.insert(), chunk)
+
+
+def create_schema(server, engine):
+    payment_last_update = server.Payment.__table__.c.last_update
+    default = payment_last_update.server_default
+    # The Payment default uses MySQL-only ON UPDATE syntax
+    if engine.dialect.name != 'mysql':
+        payment_last_update.server_default = None
+    try:
+        server.db.metadata.drop_all(engine)
+        server.db.metadata.create_all(engine)
+    finally:
+        payment_last_update.server_default = default
+
+
+def generate(url, scale=1.0, seed=42, indexes=True):
+    server = load_server(url)
+    rnd = random.Random(seed)
+    sizes = {table: max(1, int(count * scale)) for table, count in BASE_SIZES.items()}
+    now = datetime(2006, 2, 15, 5, 3, 42)
+    history_days = min(270 * max(scale, 1), 365 * 15)
+
+    with server.app.app_context():
+        engine = server.db.engine
+        create_schema(server, engine)
+        tables = server.db.metadata.tables
+
+        with engine.begin() as conn:
+            insert_rows(conn, tables['language'], (
+                {'language_id': i, 'name': language, 'last_update': now} for i, language in enumerate(LANGUAGES, 1)
+            ))
+            insert_rows(conn, tables['category'], (
+                {'category_id': i, 'name': category} for i, category in enumerate(CATEGORIES, 1)
+            ))
+            insert_rows(conn, tables['country'], (
+                {'country_id': i, 'country': name(rnd), 'last_update': str(now)} for i in range(1, COUNTRIES + 1)
+            ))
+            insert_rows(conn, tables['city'], (
+                {'city_id': i, 'city': name(rnd), 'country_id': rnd.randint(1, COUNTRIES), 'last_update': str(now)}
+                for i in range(1, CITIES + 1)
+            ))
+            addresses = sizes['customer'] + STORES * 2
+            insert_rows(conn, tables['address'], (
+                {'address_id': i, 'address': f'{rnd.randint(1, 1999)} {name(rnd)} Street', 'district': name(rnd),
+                 'city_id': rnd.randint(1, CITIES), 'postal_code': str(rnd.randint(10000, 99999)),
+                 'phone': str(rnd.randint(10 ** 9, 10 ** 10 - 1)), 'last_update': str(now)}
+                for i in range(1, addresses + 1)
+            ))
+            insert_rows(conn, tables['staff'], (
+                {'staff_id': i, 'first_name': name(rnd), 'last_name': name(rnd), 'address_id': i,
+                 'email': f'staff{i}@sakilastaff.com', 'store_id': i, 'active': True, 'username': f'staff{i}',
+                 'last_update': now}
+                for i in range(1, STORES + 1)
+            ))
+            insert_rows(conn, tables['store'], (
+                {'store_id': i, 'manager_staff_id': i, 'address_id': STORES + i, 'last_update': now}
+                for i in range(1, STORES + 1)
+            ))
+            insert_rows(conn, tables['actor'], (
+                {'actor_id': i, 'first_name': name(rnd).upper(), 'last_name': name(rnd).upper(), 'last_update': now}
+                for i in range(1, sizes['actor'] + 1)
+            ))
+
+            rates = {}
+            films = []
+            for film_id in range(1, sizes['film'] + 1):
+                rates[film_id] = rnd.choice([0.99, 2.99, 4.99])
+                films.append({
+                    'film_id': film_id,
+                    'title': f'{rnd.choice(WORDS)} {rnd.choice(WORDS)} {film_id}',
+                    'description': f'A {rnd.choice(WORDS).title()} story of a {name(rnd)} and a {name(rnd)}',
+                    'release_year': 2006,
+                    'language_id': 1,
+                    'rental_duration': rnd.randint(3, 7),
+                    'rental_rate': rates[film_id],
+                    'length': rnd.randint(46, 185),
+                    'replacement_cost': rnd.choice([9.99, 14.99, 19.99, 24.99, 29.99]),
+                    'rating': rnd.choice(RATINGS),
+                    'special_features': 'Trailers,Deleted Scenes',
+                    'last_update': now,
+                })
+            insert_rows(conn, tables['film'], films)
+
+            insert_rows(conn, tables['film_category'], (
+                {'film_id': film_id, 'category_id': rnd.randint(1, len(CATEGORIES)), 'last_update': now}
+                for film_id in range(1, sizes['film'] + 1)
+            ))
+
+            def film_actors():
+                for film_id in range(1, sizes['film'] + 1):
+                    # Stock Sakila averages about 5.5 actors per film
+                    for actor_id in rnd.sample(range(1, sizes['actor'] + 1), min(rnd.randint(3, 8), sizes['actor'])):
+                        yield {'actor_id': actor_id, 'film_id': film_id, 'last_update': now}
+            insert_rows(conn, tables['film_actor'], film_actors())
+
+            insert_rows(conn, tables['customer'], (
+                {'customer_id': i, 'store_id': rnd.randint(1, STORES), 'first_name': name(rnd).upper(),
+                 'last_name': name(rnd).upper(), 'email': f'customer{i}@sakilacustomer.org',
+                 'address_id': STORES * 2 + i, 'active': rnd.random() > 0.025,
+                 'create_date': HISTORY_START - timedelta(days=rnd.randint(1, 400)), 'last_update': now}
+                for i in range(1, sizes['customer'] + 1)
+            ))
+
+            inventory_films = [rnd.randint(1, sizes['film']) for _ in range(sizes['inventory'])]
+            insert_rows(conn, tables['inventory'], (
+                {'inventory_id': i, 'film_id': film_id, 'store_id': rnd.randint(1, STORES), 'last_update': now}
+                for i, film_id in enumerate(inventory_films, 1)
+            ))
+
+            # Rentals are generated in date order; about 1% are still out
+            step = timedelta(days=history_days) / sizes['rental']
+            rentals = []
+            payments = []
+            for rental_id in range(1, sizes['rental'] + 1):
+                rental_date = HISTORY_START + step * rental_id
+                inventory_id = rnd.randint(1, sizes['inventory'])
+                customer_id = rnd.randint(1, sizes['customer'])
+                staff_id = rnd.randint(1, STORES)
+                returned = rnd.random() > 0.01
+                rentals.append({
+                    'rental_id': rental_id,
+                    'rental_date': rental_date,
+                    'inventory_id': inventory_id,
+                    'customer_id': customer_id,
+                    'return_date': rental_date + timedelta(days=rnd.randint(1, 9), hours=rnd.randint(0, 23)) if returned else None,
+                    'staff_id': staff_id,
+                    'last_update': rental_date,
+                })
+                payments.append({
+                    'payment_id': rental_id,
+                    'customer_id': customer_id,
+                    'staff_id': staff_id,
+                    'rental_id': rental_id,
+                    'amount': rates[inventory_films[inventory_id - 1]],
+                    'payment_date': rental_date,
+                    'last_update': rental_date,
+                })
+                if len(rentals) >= CHUNK_SIZE:
+                    insert_rows(conn, tables['rental'], rentals)
+                    insert_rows(conn, tables['payment'], payments)
+                    rentals = []
+                    payments = []
+            insert_rows(conn, tables['rental'], rentals)
+            insert_rows(conn, tables['payment'], payments)
+
+        # Built after the bulk load, which is much faster than maintaining them during it
+        if indexes:
+            endpoint_indexes.upgrade(engine)
+
+    return sizes
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Fill a database with a scaled synthetic Sakila dataset.')
+    parser.add_argument('--url', default='sqlite:///bench.db', help='SQLAlchemy database URL')
+    parser.add_argument('--scale', type=float, default=1.0, help='multiple of the stock Sakila row counts')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--no-indexes', action='store_true', help='skip the migrations.endpoint_indexes indexes')
+    args = parser.parse_args()
+
+    sizes = generate(args.url, args.scale, args.seed, indexes=not args.no_indexes)
+    for table, count in sizes.items():
+        print(f'{table}: {count}')
+
+
+if __name__ == '__main__':
+    main()
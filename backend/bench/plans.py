@@ -0,0 +1,239 @@
+# Captures each route's SQL and EXPLAIN plans and checks them against golden files
+import argparse
+import json
+import os
+import re
+import sys
+import threading
+
+from sqlalchemy import event, inspect
+
+from bench import BACKEND_DIR, load_server
+
+GOLDEN_DIR = os.path.join(BACKEND_DIR, 'bench', 'plans')
+
+# Lookup tables small enough that scanning them is expected
+SMALL_TABLES = {
+    'language', 'category', 'country', 'city', 'store', 'staff',
+    'revenue_rollup_state', 'revenue_daily_store', 'revenue_daily_staff', 'revenue_daily_category',
+}
+
+FOREVER = float('inf')
+
+
+def build_routes(server):
+    with server.app.app_context():
+        session = server.db.session
+        customer_id = session.query(server.Customer.customer_id).order_by(server.Customer.customer_id).first()[0]
+        customer_ids = [row[0] for row in session.query(server.Customer.customer_id).order_by(
+            server.Customer.customer_id).limit(20)]
+        film_id = session.query(server.Film.film_id).order_by(server.Film.film_id).first()[0]
+        store_id = session.query(server.Store.store_id).order_by(server.Store.store_id).first()[0]
+        session.remove()
+    cursor = server.encode_cursor(customer_ids[-1])
+    ids = ','.join(str(customer_id) for customer_id in customer_ids)
+
+    return {
+        'GET /top_movies': '/top_movies',
+        'GET /top_actors': '/top_actors',
+        'GET /search': '/search?keyword=aca',
+        'GET /customers': '/customers?limit=50',
+        'GET /customers?cursor': f'/customers?limit=50&cursor={cursor}',
+        'GET /customers?page': '/customers?limit=50&page=5',
+        'GET /rental_info': f'/rental_info?customer_id={customer_id}',
+        'GET /search/customers': '/search/customers?keyword=mar',
+        'GET /customers/<id>/rentals': f'/customers/{customer_id}/rentals?limit=20',
+        'GET /customers/<id>/profile': f'/customers/{customer_id}/profile',
+        'GET /customers/profiles': f'/customers/profiles?ids={ids}',
+        'GET /available-rent': f'/available-rent?store_id={store_id}&limit=50',
+        'GET /films/<id>/similar': f'/films/{film_id}/similar',
+        'GET /customers/<id>/recommendations': f'/customers/{customer_id}/recommendations',
+        'GET /overdue': f'/overdue?store_id={store_id}&limit=50',
+        'GET /revenue/store': '/revenue/store?granularity=month',
+        'GET /export/rentals': '/export/rentals?format=ndjson&chunk=100',
+    }
+
+
+def steady_state(server):
+    # Keep caches and in-memory indexes from refreshing mid-capture, so only
+    # the per-request SQL is recorded (reconciler threads are filtered out
+    # by Capture)
+    app = server.app
+    for key in ('SEARCH_INDEX_REFRESH_SECONDS', 'CUSTOMER_SEARCH_REFRESH_SECONDS'):
+        app.config[key] = FOREVER
+    server.table_versions.recheck_seconds = FOREVER
+    server.reference_data.ttl_seconds = server.reference_data.check_seconds = FOREVER
+    server.result_cache.enabled = False
+
+
+def normalize_sql(statement):
+    statement = ' '.join(statement.split())
+    # IN lists vary with the data; their length is not part of the shape
+    statement = re.sub(r'\((?:\?|%s|:\w+)(?:, (?:\?|%s|:\w+))+\)', '(?...)', statement)
+    return statement
+
+
+class Capture:
+    """Records the statements the current thread sends through an engine."""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.thread = None
+        self.statements = []
+
+    def _listener(self, conn, cursor, statement, parameters, context, executemany):
+        if threading.get_ident() == self.thread:
+            self.statements.append((statement, parameters, executemany))
+
+    def __enter__(self):
+        self.thread = threading.get_ident()
+        self.statements = []
+        event.listen(self.engine, 'before_cursor_execute', self._listener)
+        return self
+
+    def __exit__(self, *exc_info):
+        event.remove(self.engine, 'before_cursor_execute', self._listener)
+
+
+def base_table(name, tables):
+    # SQLAlchemy aliases a joined table as <table>_1; derived tables (anon_1, ...) are dropped
+    if name in tables:
+        return name
+    base = re.sub(r'_\d+$', '', name)
+    return base if base in tables else None
+
+
+def explain(connection, statement, parameters, tables):
+    dialect = connection.dialect.name
+    if dialect == 'sqlite':
+        rows = connection.exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters).fetchall()
+        plan = [row[3] for row in rows]
+        scans = set()
+        for detail in plan:
+            match = re.match(r'SCAN (\w+)', detail)
+            table = base_table(match.group(1), tables) if match else None
+            if table:
+                scans.add(table)
+        return plan, scans, None
+    if dialect == 'mysql':
+        result = connection.exec_driver_sql('EXPLAIN ' + statement, parameters)
+        columns = list(result.keys())
+        plan = []
+        scans = set()
+        estimate = 0
+        for row in result:
+            row = dict(zip(columns, row))
+            # Estimates are kept to an order of magnitude so data growth alone doesn't fail the check
+            rows = row.get('rows') or 0
+            estimate += rows
+            plan.append(
+                f"{row['select_type']} {row['table']} type={row['type']} key={row['key']} "
+                f"rows~1e{len(str(int(rows))) - 1} extra={row.get('Extra') or ''}"
+            )
+            table = base_table(row['table'] or '', tables)
+            if row['type'] in ('ALL', 'index') and table:
+                scans.add(table)
+        return plan, scans, estimate
+    raise SystemExit(f'EXPLAIN capture is not implemented for {dialect}')
+
+
+def capture_route(engine, client, path, allowed_scans):
+    # First request warms lazily loaded indexes; the second is the steady state
+    client.get(path).close()
+    with Capture(engine) as capture:
+        response = client.get(path)
+        response.get_data()
+        status = response.status_code
+        response.close()
+
+    statements = []
+    with engine.connect() as connection:
+        tables = set(inspect(connection).get_table_names())
+        for statement, parameters, executemany in capture.statements:
+            entry = {'sql': normalize_sql(statement)}
+            if not executemany and statement.lstrip().upper().startswith(('SELECT', 'WITH')):
+                plan, scans, estimate = explain(connection, statement, parameters, tables)
+                entry['plan'] = plan
+                entry['full_scans'] = sorted(scans - allowed_scans)
+                if estimate is not None:
+                    entry['rows_estimate'] = estimate
+            statements.append(entry)
+    return {'status': status, 'queries': len(statements), 'statements': statements}
+
+
+def route_scans(result):
+    return {table for statement in result['statements'] for table in statement.get('full_scans', ())}
+
+
+def compare(golden, current):
+    failures = []
+    changes = []
+    for route, result in sorted(current.items()):
+        expected = golden.get(route)
+        if expected is None:
+            failures.append(f'{route}: no golden plan (run with --update to record it)')
+            continue
+        if result['queries'] > expected['queries']:
+            failures.append(f"{route}: {result['queries']} queries, golden has {expected['queries']}")
+        new_scans = route_scans(result) - route_scans(expected)
+        if new_scans:
+            failures.append(f"{route}: new full scan of {', '.join(sorted(new_scans))}")
+        if [s.get('plan') for s in result['statements']] != [s.get('plan') for s in expected['statements']]:
+            changes.append(f'{route}: plan changed')
+    return failures, changes
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Check every read route against its golden query plans.')
+    parser.add_argument('--url', default='sqlite:///bench.db', help='SQLAlchemy URL of the generated dataset')
+    parser.add_argument('--golden', help='golden file (default bench/plans/<dialect>.json)')
+    parser.add_argument('--update', action='store_true', help='write the captured plans as the new golden file')
+    parser.add_argument('--routes', nargs='*', help='only check routes whose name contains one of these')
+    parser.add_argument('--allow-scan', nargs='*', default=[], help='extra tables that may be fully scanned')
+    parser.add_argument('--strict', action='store_true', help='also fail when a plan changed without a new scan')
+    args = parser.parse_args()
+
+    server = load_server(args.url)
+    steady_state(server)
+    allowed_scans = SMALL_TABLES | set(args.allow_scan)
+    with server.app.app_context():
+        engine = server.db.engine
+    dialect = engine.dialect.name
+    golden_path = args.golden or os.path.join(GOLDEN_DIR, f'{dialect}.json')
+
+    client = server.app.test_client()
+    current = {}
+    for name, path in build_routes(server).items():
+        if args.routes and not any(part in name for part in args.routes):
+            continue
+        current[name] = capture_route(engine, client, path, allowed_scans)
+
+    if args.update:
+        golden = {}
+        if args.routes and os.path.exists(golden_path):
+            with open(golden_path) as f:
+                golden = json.load(f)
+        golden.update(current)
+        os.makedirs(os.path.dirname(golden_path), exist_ok=True)
+        with open(golden_path, 'w') as f:
+            json.dump(dict(sorted(golden.items())), f, indent=2)
+            f.write('\n')
+        print(f'Wrote {len(current)} routes to {golden_path}')
+        return
+
+    with open(golden_path) as f:
+        golden = json.load(f)
+    failures, changes = compare(golden, current)
+    for route, result in current.items():
+        scans = ', '.join(sorted(route_scans(result))) or '-'
+        print(f"{route:40} {result['queries']:>3} queries  full scans: {scans}")
+    for line in changes:
+        print(f'CHANGED  {line}')
+    for line in failures:
+        print(f'FAIL     {line}')
+    if failures or (args.strict and changes):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
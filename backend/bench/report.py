@@ -0,0 +1,67 @@
+# Compares two benchmark reports written by bench.run
+import argparse
+import json
+import sys
+
+METRICS = ('p50_ms', 'p95_ms', 'p99_ms', 'throughput_rps')
+
+
+def compare(baseline, candidate, metric='p95_ms', threshold=None):
+    rows = []
+    regressions = []
+    for route in sorted(set(baseline['routes']) | set(candidate['routes'])):
+        old = baseline['routes'].get(route)
+        new = candidate['routes'].get(route)
+        row = {'route': route}
+        for name in METRICS:
+            before = old[name] if old else None
+            after = new[name] if new else None
+            change = None
+            if before and after is not None:
+                change = (after - before) / before * 100
+            row[name] = (before, after, change)
+        rows.append(row)
+        change = row[metric][2]
+        # Higher is worse for latency, lower is worse for throughput
+        if threshold is not None and change is not None:
+            worse = -change if metric == 'throughput_rps' else change
+            if worse > threshold:
+                regressions.append(route)
+    return rows, regressions
+
+
+def format_value(value):
+    return '-' if value is None else f'{value:.2f}'
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare two benchmark reports.')
+    parser.add_argument('baseline')
+    parser.add_argument('candidate')
+    parser.add_argument('--metric', default='p95_ms', choices=METRICS, help='metric checked against --fail-over')
+    parser.add_argument('--fail-over', type=float, help='exit 1 if the metric gets worse by more than this percent')
+    args = parser.parse_args()
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.candidate) as f:
+        candidate = json.load(f)
+
+    rows, regressions = compare(baseline, candidate, args.metric, args.fail_over)
+    print(f"baseline  {baseline['meta'].get('commit')}\ncandidate {candidate['meta'].get('commit')}\n")
+    print(f"{'route':28}" + ''.join(f'{name:>30}' for name in METRICS))
+    for row in rows:
+        cells = []
+        for name in METRICS:
+            before, after, change = row[name]
+            delta = '' if change is None else f' ({change:+.1f}%)'
+            cells.append(f'{format_value(before)} -> {format_value(after)}{delta}'.rjust(30))
+        print(f"{row['route']:28}" + ''.join(cells))
+
+    if regressions:
+        print(f"\n{args.metric} regressed by more than {args.fail_over}% on: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
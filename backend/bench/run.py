@@ -0,0 +1,241 @@
+# Drives every backend route at a fixed concurrency and records latency percentiles
+import argparse
+import asyncio
+import json
+import platform
+import random
+import subprocess
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from sqlalchemy.engine import make_url
+
+from bench import BACKEND_DIR, load_async_app, load_server
+
+KEYWORDS = ['a', 'ac', 'aca', 'academy', 'drama', 'son', 'zz', 'mar', 'ka']
+
+
+class TestClientAdapter:
+    """Sends requests through Flask's test client, one client per thread."""
+
+    def __init__(self, app):
+        self.app = app
+        self.local = threading.local()
+
+    def request(self, method, path, body=None):
+        client = getattr(self.local, 'client', None)
+        if client is None:
+            client = self.local.client = self.app.test_client()
+        response = client.open(path, method=method, json=body)
+        data = response.get_json(silent=True)
+        response.close()
+        return response.status_code, data
+
+
+class AsgiAdapter:
+    """Sends requests straight into the ASGI app, all on one event loop thread.
+
+    Benchmark threads only wait on their futures, so the requests in flight
+    share that loop and the async connection pool as they would under an
+    ASGI server.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.loop = asyncio.new_event_loop()
+        threading.Thread(target=self.loop.run_forever, daemon=True).start()
+        asyncio.run_coroutine_threadsafe(app.ensure_started(), self.loop).result()
+
+    def request(self, method, path, body=None):
+        return asyncio.run_coroutine_threadsafe(self._request(method, path, body), self.loop).result()
+
+    async def _request(self, method, path, body):
+        path, _, query = path.partition('?')
+        data = json.dumps(body).encode() if body is not None else b''
+        headers = [(b'host', b'bench')]
+        if body is not None:
+            headers += [(b'content-type', b'application/json'), (b'content-length', str(len(data)).encode())]
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': method,
+            'scheme': 'http', 'path': path, 'raw_path': path.encode(), 'query_string': query.encode(),
+            'root_path': '', 'headers': headers, 'server': ('bench', 80), 'client': ('127.0.0.1', 0),
+        }
+        pending = [{'type': 'http.request', 'body': data, 'more_body': False}]
+        response = {'status': None, 'body': []}
+
+        async def receive():
+            return pending.pop() if pending else {'type': 'http.disconnect'}
+
+        async def send(message):
+            if message['type'] == 'http.response.start':
+                response['status'] = message['status']
+            else:
+                response['body'].append(message.get('body', b''))
+
+        await self.app(scope, receive, send)
+        try:
+            payload = json.loads(b''.join(response['body']) or b'null')
+        except ValueError:
+            payload = None
+        return response['status'], payload
+
+
+class HttpAdapter:
+    """Sends requests to a running server over HTTP."""
+
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip('/')
+
+    def request(self, method, path, body=None):
+        data = json.dumps(body).encode() if body is not None else None
+        request = urllib.request.Request(self.base_url + path, data=data, method=method)
+        if data is not None:
+            request.add_header('Content-Type', 'application/json')
+        try:
+            with urllib.request.urlopen(request) as response:
+                return response.status, json.loads(response.read() or b'null')
+        except urllib.error.HTTPError as e:
+            return e.code, None
+
+
+def build_scenarios(server, include_writes):
+    with server.app.app_context():
+        session = server.db.session
+        customer_ids = [row[0] for row in session.query(server.Customer.customer_id).limit(5000)]
+        inventory_ids = [row[0] for row in session.query(server.Inventory.inventory_id).limit(50000)]
+        staff_ids = [row[0] for row in session.query(server.Staff.staff_id)]
+        session.remove()
+
+    scenarios = {
+        'GET /top_movies': lambda rnd: ('GET', '/top_movies', None),
+        'GET /top_actors': lambda rnd: ('GET', '/top_actors', None),
+        'GET /search': lambda rnd: ('GET', f'/search?keyword={rnd.choice(KEYWORDS)}', None),
+        'GET /customers': lambda rnd: ('GET', '/customers?limit=50', None),
+        'GET /customers?page': lambda rnd: ('GET', f'/customers?page={rnd.randint(1, max(1, len(customer_ids) // 50))}&limit=50', None),
+        'GET /rental_info': lambda rnd: ('GET', f'/rental_info?customer_id={rnd.choice(customer_ids)}', None),
+        'GET /search/customers': lambda rnd: ('GET', f'/search/customers?keyword={rnd.choice(KEYWORDS)}', None),
+        'GET /available-rent': lambda rnd: ('GET', '/available-rent', None),
+        'GET /metrics': lambda rnd: ('GET', '/metrics', None),
+    }
+    if include_writes:
+        scenarios['POST /add_rental/batch'] = lambda rnd: ('POST', '/add_rental/batch', {'rentals': [
+            {'inventory_id': rnd.choice(inventory_ids), 'customer_id': rnd.choice(customer_ids),
+             'staff_id': rnd.choice(staff_ids)}
+            for _ in range(5)
+        ]})
+    return scenarios
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def run_scenario(adapter, make_request, requests, concurrency, warmup, seed):
+    rnd = random.Random(seed)
+    # Request plans are drawn up front so every run sends the same sequence
+    plans = [make_request(rnd) for _ in range(warmup + requests)]
+    for method, path, body in plans[:warmup]:
+        adapter.request(method, path, body)
+
+    def timed(plan):
+        method, path, body = plan
+        start = time.perf_counter()
+        try:
+            status, data = adapter.request(method, path, body)
+        except Exception:
+            status, data = None, None
+        elapsed = time.perf_counter() - start
+        # Put rented copies back so write runs don't drain the catalog
+        if method == 'POST' and path == '/add_rental/batch' and isinstance(data, dict):
+            rental_ids = [item['rental_id'] for item in data.get('results', []) if item and item.get('rental_id')]
+            if rental_ids:
+                adapter.request('POST', '/rental_movie/batch', rental_ids)
+        return elapsed, status
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(timed, plans[warmup:]))
+    wall = time.perf_counter() - started
+
+    latencies = sorted(elapsed for elapsed, _ in results)
+    errors = sum(1 for _, status in results if status is None or status >= 500)
+    return {
+        'count': len(results),
+        'errors': errors,
+        'mean_ms': round(sum(latencies) / len(latencies) * 1000, 3),
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 3),
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 3),
+        'max_ms': round(latencies[-1] * 1000, 3),
+        'throughput_rps': round(len(results) / wall, 2),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd=BACKEND_DIR, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark every backend route.')
+    parser.add_argument('--url', default='sqlite:///bench.db', help='SQLAlchemy URL of the generated dataset')
+    parser.add_argument('--base-url', help='benchmark a running server instead of the Flask test client')
+    parser.add_argument('--asgi', action='store_true', help='go through the async app in async_server.py')
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--requests', type=int, default=200, help='timed requests per route')
+    parser.add_argument('--warmup', type=int, default=5, help='untimed requests per route')
+    parser.add_argument('--routes', nargs='*', help='only run scenarios whose name contains one of these')
+    parser.add_argument('--include-writes', action='store_true', help='also benchmark batch rental checkout')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='write the JSON report here as well as to stdout')
+    args = parser.parse_args()
+
+    server = load_server(args.url)
+    if args.base_url:
+        adapter = HttpAdapter(args.base_url)
+    elif args.asgi:
+        adapter = AsgiAdapter(load_async_app(args.url))
+    else:
+        adapter = TestClientAdapter(server.app)
+    scenarios = build_scenarios(server, args.include_writes)
+    if args.routes:
+        scenarios = {name: scenario for name, scenario in scenarios.items() if any(part in name for part in args.routes)}
+
+    report = {
+        'meta': {
+            'commit': git_commit(),
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'database': make_url(args.url).render_as_string(hide_password=True) if not args.base_url else None,
+            'target': args.base_url or ('asgi' if args.asgi else 'test-client'),
+            'concurrency': args.concurrency,
+            'requests': args.requests,
+            'warmup': args.warmup,
+            'seed': args.seed,
+            'python': platform.python_version(),
+        },
+        'routes': {},
+    }
+    for name, scenario in scenarios.items():
+        report['routes'][name] = run_scenario(adapter, scenario, args.requests, args.concurrency, args.warmup, args.seed)
+        print(f"{name:28} p50 {report['routes'][name]['p50_ms']:9.2f} ms  p95 {report['routes'][name]['p95_ms']:9.2f} ms  "
+              f"p99 {report['routes'][name]['p99_ms']:9.2f} ms  {report['routes'][name]['throughput_rps']:9.1f} req/s")
+
+    output = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+# Deployment settings from an optional config file and SAKILA_* environment variables
+import os
+
+from sqlalchemy.engine import make_url
+
+REPLICA_BIND_PREFIX = 'replica_'
+
+
+def as_bool(value):
+    return value.strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+def as_list(value):
+    return [item.strip() for item in value.split(',') if item.strip()]
+
+
+# app.config key -> (environment variable, parser)
+ENV_SETTINGS = {
+    'SQLALCHEMY_DATABASE_URI': ('SAKILA_DATABASE_URI', str),
+    'DATABASE_REPLICA_URIS': ('SAKILA_REPLICA_URIS', as_list),
+    'DATABASE_POOL_SIZE': ('SAKILA_POOL_SIZE', int),
+    'DATABASE_MAX_OVERFLOW': ('SAKILA_MAX_OVERFLOW', int),
+    'DATABASE_POOL_PRE_PING': ('SAKILA_POOL_PRE_PING', as_bool),
+    'DATABASE_POOL_RECYCLE': ('SAKILA_POOL_RECYCLE', int),
+    'REPLICA_STICKY_SECONDS': ('SAKILA_REPLICA_STICKY_SECONDS', float),
+    'RENTAL_WRITE_BEHIND': ('RENTAL_WRITE_BEHIND', as_bool),
+    'RESULT_CACHE_ENABLED': ('SAKILA_RESULT_CACHE', as_bool),
+    'RESULT_CACHE_SHARED_PATH': ('SAKILA_RESULT_CACHE_PATH', str),
+    'ASYNC_POOL_SIZE': ('SAKILA_ASYNC_POOL_SIZE', int),
+    'ASYNC_MAX_OVERFLOW': ('SAKILA_ASYNC_MAX_OVERFLOW', int),
+    'ASYNC_POOL_TIMEOUT': ('SAKILA_ASYNC_POOL_TIMEOUT', float),
+    'ASYNC_WSGI_THREADS': ('SAKILA_ASYNC_WSGI_THREADS', int),
+}
+
+
+def engine_options(config, uri, pool_size_key='DATABASE_POOL_SIZE', max_overflow_key='DATABASE_MAX_OVERFLOW'):
+    options = {'pool_pre_ping': config['DATABASE_POOL_PRE_PING']}
+    if config['DATABASE_POOL_RECYCLE'] is not None:
+        options['pool_recycle'] = config['DATABASE_POOL_RECYCLE']
+    url = make_url(uri)
+    # In-memory SQLite uses a single-connection pool that takes no sizing
+    if not (url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:')):
+        if config.get(pool_size_key) is not None:
+            options['pool_size'] = config[pool_size_key]
+        if config.get(max_overflow_key) is not None:
+            options['max_overflow'] = config[max_overflow_key]
+    return options
+
+
+def load_config(app):
+    """Applies the config file named by SAKILA_CONFIG, then environment overrides.
+
+    Must run after the defaults are set and before SQLAlchemy(app), since it
+    fills in SQLALCHEMY_ENGINE_OPTIONS for the primary and one
+    SQLALCHEMY_BINDS entry per replica (replica_0, replica_1, ...).
+    """
+    app.config.from_envvar('SAKILA_CONFIG', silent=True)
+    for key, (name, parse) in ENV_SETTINGS.items():
+        if name in os.environ:
+            app.config[key] = parse(os.environ[name])
+
+    config = app.config
+    config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+        **engine_options(config, config['SQLALCHEMY_DATABASE_URI']),
+        **config.get('SQLALCHEMY_ENGINE_OPTIONS', {}),
+    }
+    binds = dict(config.get('SQLALCHEMY_BINDS') or {})
+    for index, uri in enumerate(config['DATABASE_REPLICA_URIS']):
+        binds[f'{REPLICA_BIND_PREFIX}{index}'] = {'url': uri, **engine_options(config, uri)}
+    config['SQLALCHEMY_BINDS'] = binds
@@ -0,0 +1,73 @@
+# Streamed CSV / NDJSON exports, optionally gzipped
+import csv
+import io
+import zlib
+
+from flask import Response, current_app, stream_with_context
+
+from fieldsets import convert
+from streaming import NDJSON_MIMETYPE, STREAM_CHUNK_BYTES
+
+EXPORT_FORMATS = ('csv', 'ndjson')
+
+
+def csv_chunks(rows, columns, header=True):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(columns)
+    for row in rows:
+        writer.writerow(['' if value is None else convert(value) for value in row])
+        if buffer.tell() >= STREAM_CHUNK_BYTES:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def ndjson_chunks(rows, columns):
+    dumps = current_app.json.dumps
+    buffer = []
+    size = 0
+    for row in rows:
+        line = dumps({name: convert(value) for name, value in zip(columns, row)}) + '\n'
+        buffer.append(line)
+        size += len(line)
+        if size >= STREAM_CHUNK_BYTES:
+            yield ''.join(buffer)
+            buffer = []
+            size = 0
+    if buffer:
+        yield ''.join(buffer)
+
+
+def gzip_chunks(chunks):
+    # A sync flush after every chunk means whatever part of the download
+    # arrived before an interruption still decompresses
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        yield compressor.compress(chunk.encode()) + compressor.flush(zlib.Z_SYNC_FLUSH)
+    yield compressor.flush()
+
+
+def export_response(rows, columns, export_format, filename, gzip=False, header=True, headers=None):
+    """Streams rows (tuples in columns order) as CSV or NDJSON.
+
+    rows should be a server-side cursor (Query.yield_per) so memory stays
+    flat however many rows the export covers.
+    """
+    if export_format == 'csv':
+        chunks = csv_chunks(rows, columns, header=header)
+        mimetype = 'text/csv'
+    else:
+        chunks = ndjson_chunks(rows, columns)
+        mimetype = NDJSON_MIMETYPE
+    filename = f'{filename}.{export_format}'
+    if gzip:
+        chunks = gzip_chunks(chunks)
+        mimetype = 'application/gzip'
+        filename += '.gz'
+    response = Response(stream_with_context(chunks), mimetype=mimetype, headers=headers)
+    response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
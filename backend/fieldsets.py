@@ -0,0 +1,69 @@
+# Shared ?fields= handling: which columns to SELECT and how to serialize them
+from datetime import date, datetime
+from decimal import Decimal
+
+
+class InvalidFields(ValueError):
+    pass
+
+
+def convert(value):
+    # JSON-safe form of a column value
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+class FieldSet:
+    """Named columns of one resource, plus fields derived from them.
+
+    parse() turns a ?fields=a,b value into a tuple of names (the defaults
+    when absent), columns() gives only the columns those names need so the
+    projection happens in the SELECT, and serialize() converts just those
+    values. The key field is always included so cursors keep working.
+    Derived fields (filled in by an enrich callback, e.g. from reference
+    data) declare the columns they are computed from.
+    """
+
+    def __init__(self, columns, key, default=None, derived=None):
+        self._columns = dict(columns)
+        self.key = key
+        self.derived = dict(derived or {})
+        self.default = tuple(default or (*self._columns, *self.derived))
+
+    @property
+    def names(self):
+        return (*self._columns, *self.derived)
+
+    def parse(self, raw):
+        if raw is None or not raw.strip():
+            return self.default
+        names = [name.strip() for name in raw.split(',') if name.strip()]
+        unknown = [name for name in names if name not in self._columns and name not in self.derived]
+        if unknown:
+            raise InvalidFields(f"Unknown field(s): {', '.join(unknown)}")
+        if self.key not in names:
+            names.insert(0, self.key)
+        return tuple(dict.fromkeys(names))
+
+    def selected(self, names):
+        # Column names needed for names, in declaration order
+        needed = set(names)
+        for name in names:
+            needed.update(self.derived.get(name, ()))
+        return [name for name in self._columns if name in needed]
+
+    def columns(self, names):
+        return [self._columns[name] for name in self.selected(names)]
+
+    def serialize(self, row, names, enrich=None):
+        item = {name: convert(getattr(row, name)) for name in self.selected(names)}
+        if enrich is not None and any(name in self.derived for name in names):
+            enrich(item)
+        return self.project(item, names)
+
+    def project(self, item, names):
+        # Trims an already built dict down to names, keeping their order
+        return {name: item.get(name) for name in names if name in item or name in self.derived}
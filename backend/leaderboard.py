@@ -0,0 +1,125 @@
+# In-process rental leaderboards for /top_movies and /top_actors
+import heapq
+import threading
+
+
+class RentalLeaderboard:
+    """Per-film rental counters kept in memory, with the actor/film links.
+
+    The counters are loaded from the database once and then bumped by
+    record_rental(), so reading a top-k list is a heap selection over the
+    counters instead of a GROUP BY over rental, inventory and film.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._version = 0
+        self._cache = {}
+        self.loaded = False
+        self.film_titles = {}
+        self.actor_names = {}
+        self.actor_films = {}
+        self.inventory_films = {}
+        self.film_counts = {}
+
+    def load(self, film_titles, actor_names, film_actors, inventory_films, film_counts):
+        # Build every structure first and swap them in under the lock,
+        # so readers never see a half-built snapshot
+        actor_films = {}
+        for actor_id, film_id in film_actors:
+            actor_films.setdefault(actor_id, set()).add(film_id)
+
+        film_counts = {film_id: count for film_id, count in film_counts if count}
+
+        with self._lock:
+            self.film_titles = dict(film_titles)
+            self.actor_names = dict(actor_names)
+            self.actor_films = actor_films
+            self.inventory_films = dict(inventory_films)
+            self.film_counts = film_counts
+            self._version += 1
+            self._cache.clear()
+            self.loaded = True
+
+    def record_rental(self, inventory_id, film_id=None):
+        with self._lock:
+            if film_id is None:
+                film_id = self.inventory_films.get(inventory_id)
+            else:
+                self.inventory_films[inventory_id] = film_id
+            if film_id is None:
+                return False
+            self.film_counts[film_id] = self.film_counts.get(film_id, 0) + 1
+            self._version += 1
+            self._cache.clear()
+            return True
+
+    def top_films(self, k):
+        with self._lock:
+            key = ('films', k)
+            if key not in self._cache:
+                # Ties are broken on the lower film_id to keep results stable
+                self._cache[key] = heapq.nlargest(
+                    k, self.film_counts.items(), key=lambda item: (item[1], -item[0])
+                )
+            return list(self._cache[key])
+
+    def top_actors(self, actor_limit, movie_limit):
+        # Actors are ranked by number of films, with the same fields as the SQL version
+        with self._lock:
+            key = ('actors', actor_limit, movie_limit)
+            if key in self._cache:
+                return self._cache[key]
+
+            actors = heapq.nlargest(
+                actor_limit, self.actor_films.items(),
+                key=lambda item: (len(item[1]), -item[0])
+            )
+            result = []
+            for actor_id, films in actors:
+                rented = [(film_id, self.film_counts[film_id]) for film_id in films if film_id in self.film_counts]
+                top_movies = heapq.nlargest(movie_limit, rented, key=lambda item: (item[1], -item[0]))
+                first_name, last_name = self.actor_names.get(actor_id, (None, None))
+                result.append({
+                    'actor_id': actor_id,
+                    'first_name': first_name,
+                    'last_name': last_name,
+                    'film_count': len(films),
+                    'top_movies': [
+                        {'film_id': film_id, 'title': self.film_titles.get(film_id), 'rental_count': count}
+                        for film_id, count in top_movies
+                    ]
+                })
+            self._cache[key] = result
+            return result
+
+
+class Reconciler(threading.Thread):
+    """Background thread that periodically calls a refresh function.
+
+    With immediate=True the first call happens as soon as the thread starts
+    rather than after one interval; an interval of 0 then means run once.
+    """
+
+    def __init__(self, refresh, interval, name='leaderboard-reconciler', immediate=False):
+        super().__init__(daemon=True, name=name)
+        self.refresh = refresh
+        self.interval = interval
+        self.immediate = immediate
+        self._stop_event = threading.Event()
+
+    def run(self):
+        if self.immediate:
+            self._refresh()
+        while self.interval and not self._stop_event.wait(self.interval):
+            self._refresh()
+
+    def _refresh(self):
+        try:
+            self.refresh()
+        except Exception:
+            # A failed pass just keeps the current counters until the next one
+            pass
+
+    def stop(self):
+        self._stop_event.set()
@@ -0,0 +1,151 @@
+# Per-route request and SQL metrics, exposed in Prometheus text format
+import logging
+import threading
+import time
+
+from flask import Response, g, has_request_context, request
+from sqlalchemy import event
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+slow_query_log = logging.getLogger('sakila.slow_query')
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+                break
+        self.total += 1
+        self.sum += value
+
+    def render(self, name, labels):
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {self.total}')
+        lines.append(f'{name}_sum{{{labels}}} {self.sum}')
+        lines.append(f'{name}_count{{{labels}}} {self.total}')
+        return lines
+
+
+class RequestMetrics:
+    """Collects latency, SQL and slow-query figures keyed by route.
+
+    Request timing comes from Flask before/after_request hooks and SQL
+    timing from engine cursor events. Statements run outside a request
+    (background refreshes) are counted under the route "background".
+    """
+
+    def __init__(self, slow_query_seconds=0.2):
+        self.slow_query_seconds = slow_query_seconds
+        self._lock = threading.Lock()
+        self.latency = {}
+        self.requests = {}
+        self.queries_per_request = {}
+        self.sql_statements = {}
+        self.sql_seconds = {}
+        self.sql_rows = {}
+        self.slow_queries = {}
+
+    def init_app(self, app, engine):
+        self.slow_query_seconds = app.config.get('SLOW_QUERY_SECONDS', self.slow_query_seconds)
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        self.watch_engine(engine)
+        app.add_url_rule('/metrics', 'metrics', self.metrics_view, methods=['GET'])
+
+    def watch_engine(self, engine):
+        event.listen(engine, 'before_cursor_execute', self._before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', self._after_cursor_execute)
+
+    def _route(self):
+        if not has_request_context():
+            return 'background'
+        return request.url_rule.rule if request.url_rule else 'unmatched'
+
+    def _before_request(self):
+        g.metrics_start = time.perf_counter()
+        g.metrics_sql_count = 0
+
+    def _after_request(self, response):
+        start = g.pop('metrics_start', None)
+        if start is None:
+            return response
+        elapsed = time.perf_counter() - start
+        route = self._route()
+        key = (route, request.method)
+        with self._lock:
+            self.latency.setdefault(key, Histogram(LATENCY_BUCKETS)).observe(elapsed)
+            status_key = (route, request.method, response.status_code)
+            self.requests[status_key] = self.requests.get(status_key, 0) + 1
+            self.queries_per_request.setdefault(route, Histogram(QUERY_COUNT_BUCKETS)).observe(
+                g.pop('metrics_sql_count', 0)
+            )
+        return response
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('metrics_query_start', []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get('metrics_query_start')
+        if not starts:
+            return
+        elapsed = time.perf_counter() - starts.pop()
+        route = self._route()
+        # rowcount is -1 when the driver doesn't know it (e.g. unbuffered SELECT)
+        rows = max(cursor.rowcount, 0)
+        with self._lock:
+            self.sql_statements[route] = self.sql_statements.get(route, 0) + 1
+            self.sql_seconds[route] = self.sql_seconds.get(route, 0.0) + elapsed
+            self.sql_rows[route] = self.sql_rows.get(route, 0) + rows
+        if has_request_context() and 'metrics_sql_count' in g:
+            g.metrics_sql_count += 1
+        if elapsed >= self.slow_query_seconds:
+            with self._lock:
+                self.slow_queries[route] = self.slow_queries.get(route, 0) + 1
+            slow_query_log.warning('%.1f ms on %s: %s', elapsed * 1000, route, ' '.join(statement.split()))
+
+    def render(self):
+        lines = []
+        with self._lock:
+            lines.append('# HELP http_request_duration_seconds Request latency by route.')
+            lines.append('# TYPE http_request_duration_seconds histogram')
+            for (route, method), histogram in sorted(self.latency.items()):
+                lines.extend(histogram.render('http_request_duration_seconds', f'route="{route}",method="{method}"'))
+
+            lines.append('# HELP http_requests_total Requests by route and status.')
+            lines.append('# TYPE http_requests_total counter')
+            for (route, method, status), count in sorted(self.requests.items()):
+                lines.append(f'http_requests_total{{route="{route}",method="{method}",status="{status}"}} {count}')
+
+            lines.append('# HELP sql_statements_per_request SQL statements issued per request.')
+            lines.append('# TYPE sql_statements_per_request histogram')
+            for route, histogram in sorted(self.queries_per_request.items()):
+                lines.extend(histogram.render('sql_statements_per_request', f'route="{route}"'))
+
+            counters = (
+                ('sql_statements_total', 'SQL statements executed.', self.sql_statements),
+                ('sql_duration_seconds_total', 'Time spent in SQL statements.', self.sql_seconds),
+                ('sql_rows_total', 'Rows reported by the driver for SQL statements.', self.sql_rows),
+                ('sql_slow_queries_total', 'Statements slower than the slow-query threshold.', self.slow_queries),
+            )
+            for name, help_text, values in counters:
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} counter')
+                for route, value in sorted(values.items()):
+                    lines.append(f'{name}{{route="{route}"}} {value}')
+        return '\n'.join(lines) + '\n'
+
+    def metrics_view(self):
+        return Response(self.render(), mimetype='text/plain; version=0.0.4')
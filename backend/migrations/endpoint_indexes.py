@@ -0,0 +1,83 @@
+# Indexes behind the read endpoints and the incremental index refreshes
+import argparse
+
+from sqlalchemy import Index, MetaData, Table, create_engine, inspect
+
+# (table, index name, columns). An index is skipped when an existing one
+# (or the primary key) already starts with the same columns, so running
+# this against the stock Sakila schema only adds what is missing.
+INDEXES = [
+    # MAX(last_update) stamps for conditional GET / the result cache, and
+    # the "changed since" scans of the in-memory indexes
+    ('rental', 'idx_rental_last_update', ('last_update',)),
+    ('customer', 'idx_customer_last_update', ('last_update',)),
+    ('film', 'idx_film_last_update', ('last_update',)),
+    ('actor', 'idx_actor_last_update', ('last_update',)),
+    ('film_actor', 'idx_film_actor_last_update', ('last_update',)),
+    ('film_category', 'idx_film_category_last_update', ('last_update',)),
+    ('inventory', 'idx_inventory_last_update', ('last_update',)),
+    # Open rentals for /overdue and availability
+    ('rental', 'idx_rental_return_date', ('return_date',)),
+    # Per-customer history, newest first (/rental_info, profiles, /customers/<id>/rentals)
+    ('rental', 'idx_rental_customer_date', ('customer_id', 'rental_date')),
+    ('rental', 'idx_rental_inventory', ('inventory_id',)),
+    ('inventory', 'idx_inventory_film', ('film_id',)),
+    ('inventory', 'idx_inventory_store_film', ('store_id', 'film_id')),
+    ('film_actor', 'idx_film_actor_film', ('film_id',)),
+    ('film_category', 'idx_film_category_category', ('category_id',)),
+    # Correlated payment totals in /export/rentals
+    ('payment', 'idx_payment_rental', ('rental_id',)),
+    # Payment totals in customer profiles
+    ('payment', 'idx_payment_customer', ('customer_id',)),
+]
+
+
+def covered(inspector, table, columns):
+    existing = [index['column_names'] for index in inspector.get_indexes(table)]
+    existing.append(inspector.get_pk_constraint(table).get('constrained_columns') or [])
+    return any(tuple(names[:len(columns)]) == tuple(columns) for names in existing)
+
+
+def upgrade(engine):
+    inspector = inspect(engine)
+    tables = set(inspector.get_table_names())
+    metadata = MetaData()
+    created = []
+    for table_name, name, columns in INDEXES:
+        if table_name not in tables or covered(inspector, table_name, columns):
+            continue
+        table = Table(table_name, metadata, autoload_with=engine)
+        Index(name, *(table.c[column] for column in columns)).create(engine)
+        created.append(name)
+        inspector = inspect(engine)
+    return created
+
+
+def downgrade(engine):
+    inspector = inspect(engine)
+    metadata = MetaData()
+    dropped = []
+    for table_name, name, columns in INDEXES:
+        if not inspector.has_table(table_name):
+            continue
+        if name not in {index['name'] for index in inspector.get_indexes(table_name)}:
+            continue
+        table = Table(table_name, metadata, autoload_with=engine)
+        Index(name, *(table.c[column] for column in columns)).drop(engine)
+        dropped.append(name)
+    return dropped
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Add (or remove) the indexes the endpoints rely on.')
+    parser.add_argument('--url', required=True, help='SQLAlchemy database URL')
+    parser.add_argument('--downgrade', action='store_true', help='drop the indexes this migration created')
+    args = parser.parse_args()
+
+    engine = create_engine(args.url)
+    names = downgrade(engine) if args.downgrade else upgrade(engine)
+    print(f"{'Dropped' if args.downgrade else 'Created'}: {', '.join(names) if names else 'nothing to do'}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+# Daily revenue rollup tables behind /revenue/<dimension>
+import argparse
+
+from sqlalchemy import Column, Date, DateTime, Integer, MetaData, Numeric, String, Table, create_engine, inspect
+
+metadata = MetaData()
+
+
+def daily_table(name, key):
+    return Table(
+        name, metadata,
+        Column('day', Date, primary_key=True),
+        Column(key, Integer, primary_key=True),
+        Column('amount', Numeric(12, 2), nullable=False, default=0),
+        Column('payment_count', Integer, nullable=False, default=0),
+    )
+
+
+# payment_id watermark of what has been folded into the rollups
+rollup_state = Table(
+    'revenue_rollup_state', metadata,
+    Column('name', String(32), primary_key=True),
+    Column('last_payment_id', Integer, nullable=False, default=0),
+    Column('last_payment_date', DateTime),
+    Column('last_update', DateTime),
+)
+
+TABLES = [
+    daily_table('revenue_daily_store', 'store_id'),
+    daily_table('revenue_daily_staff', 'staff_id'),
+    daily_table('revenue_daily_category', 'category_id'),
+    rollup_state,
+]
+
+
+def upgrade(engine):
+    existing = set(inspect(engine).get_table_names())
+    created = []
+    for table in TABLES:
+        if table.name not in existing:
+            table.create(engine)
+            created.append(table.name)
+    if rollup_state.name in created:
+        # The app locks this row for each catch-up pass, so it exists from the start
+        with engine.begin() as conn:
+            conn.execute(rollup_state.insert().values(name='payment', last_payment_id=0))
+    return created
+
+
+def downgrade(engine):
+    existing = set(inspect(engine).get_table_names())
+    dropped = []
+    for table in reversed(TABLES):
+        if table.name in existing:
+            table.drop(engine)
+            dropped.append(table.name)
+    return dropped
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Create (or drop) the revenue rollup tables.')
+    parser.add_argument('--url', required=True, help='SQLAlchemy database URL')
+    parser.add_argument('--downgrade', action='store_true', help='drop the rollup tables')
+    args = parser.parse_args()
+
+    engine = create_engine(args.url)
+    names = downgrade(engine) if args.downgrade else upgrade(engine)
+    print(f"{'Dropped' if args.downgrade else 'Created'}: {', '.join(names) if names else 'nothing to do'}")
+
+
+if __name__ == '__main__':
+    main()
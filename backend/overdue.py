@@ -0,0 +1,80 @@
+# Incrementally maintained set of overdue rentals for /overdue
+import heapq
+import threading
+from bisect import bisect_left, bisect_right, insort
+from collections import namedtuple
+
+OpenRental = namedtuple('OpenRental', ['rental_id', 'customer_id', 'inventory_id', 'store_id', 'film_id',
+                                       'title', 'rental_date', 'due_date'])
+
+
+class OverdueTracker:
+    """Open rentals split into not-yet-due (a heap on due date) and overdue.
+
+    apply() takes rentals that are new or changed since the last scan and
+    files them by due date, or drops them once returned. advance() moves
+    rentals whose due date has passed from the heap to the overdue set, so
+    time passing never needs a query. The overdue set is kept in sorted
+    rental_id lists (all and per store) for keyset pagination.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.loaded = False
+        self.open = {}
+        self._due = []
+        self._overdue = []
+        self._overdue_by_store = {}
+
+    def _add_overdue(self, rental):
+        index = bisect_left(self._overdue, rental.rental_id)
+        if index < len(self._overdue) and self._overdue[index] == rental.rental_id:
+            return
+        insort(self._overdue, rental.rental_id)
+        insort(self._overdue_by_store.setdefault(rental.store_id, []), rental.rental_id)
+
+    def _remove_overdue(self, rental):
+        for ids in (self._overdue, self._overdue_by_store.get(rental.store_id, [])):
+            index = bisect_left(ids, rental.rental_id)
+            if index < len(ids) and ids[index] == rental.rental_id:
+                del ids[index]
+
+    def apply(self, open_rentals, returned_ids, now):
+        with self._lock:
+            for rental_id in returned_ids:
+                self.returned(rental_id)
+            for rental in open_rentals:
+                if rental.rental_id in self.open:
+                    self.returned(rental.rental_id)
+                self.open[rental.rental_id] = rental
+                if rental.due_date <= now:
+                    self._add_overdue(rental)
+                else:
+                    heapq.heappush(self._due, (rental.due_date, rental.rental_id))
+            self.loaded = True
+
+    def returned(self, rental_id):
+        with self._lock:
+            rental = self.open.pop(rental_id, None)
+            # Heap entries for it are skipped lazily in advance()
+            if rental is not None:
+                self._remove_overdue(rental)
+
+    def advance(self, now):
+        with self._lock:
+            while self._due and self._due[0][0] <= now:
+                due_date, rental_id = heapq.heappop(self._due)
+                rental = self.open.get(rental_id)
+                if rental is not None and rental.due_date == due_date:
+                    self._add_overdue(rental)
+
+    def overdue(self, store_id=None, after=None, limit=50):
+        # Returns up to limit + 1 rentals so callers can tell if more remain
+        with self._lock:
+            ids = self._overdue if store_id is None else self._overdue_by_store.get(store_id, [])
+            start = bisect_right(ids, after) if after is not None else 0
+            return [self.open[rental_id] for rental_id in ids[start:start + limit + 1]]
+
+    def count(self, store_id=None):
+        with self._lock:
+            return len(self._overdue if store_id is None else self._overdue_by_store.get(store_id, []))
@@ -0,0 +1,105 @@
+# Film x film co-rental matrix for "customers who rented this also rented"
+import heapq
+import math
+import threading
+from array import array
+from bisect import bisect_left
+
+
+class CoRentalMatrix:
+    """Sparse co-rental counts with each film's top-k neighbours precomputed.
+
+    A film's row is two parallel arrays (sorted neighbour film_ids and the
+    number of customers who rented both), and each customer's rented films
+    are a sorted array, which keeps memory close to the number of non-zero
+    pairs. New rentals are folded in with add_rentals(); only the rows they
+    touch are merged and have their top-k recomputed.
+    """
+
+    def __init__(self, top_k=20):
+        self.top_k = top_k
+        self._lock = threading.RLock()
+        self.last_rental_id = 0
+        self.loaded = False
+        self.customer_films = {}
+        self.film_customers = {}
+        self._neighbours = {}
+        self._counts = {}
+        self._top = {}
+
+    def add_rentals(self, rentals):
+        """Folds (rental_id, customer_id, film_id) rows, in rental_id order, into the matrix."""
+        with self._lock:
+            delta = {}
+            for rental_id, customer_id, film_id in rentals:
+                self.last_rental_id = max(self.last_rental_id, rental_id)
+                films = self.customer_films.get(customer_id)
+                if films is None:
+                    films = self.customer_films[customer_id] = array('i')
+                index = bisect_left(films, film_id)
+                if index < len(films) and films[index] == film_id:
+                    # Pairs count distinct customers, so repeat rentals add nothing
+                    continue
+                for other in films:
+                    row = delta.setdefault(film_id, {})
+                    row[other] = row.get(other, 0) + 1
+                    row = delta.setdefault(other, {})
+                    row[film_id] = row.get(film_id, 0) + 1
+                films.insert(index, film_id)
+                self.film_customers[film_id] = self.film_customers.get(film_id, 0) + 1
+                delta.setdefault(film_id, {})
+
+            for film_id, changes in delta.items():
+                self._merge_row(film_id, changes)
+            # Popularity feeds the score, so neighbours of changed films are re-ranked too
+            touched = set(delta)
+            for film_id in delta:
+                touched.update(self._neighbours.get(film_id, ()))
+            for film_id in touched:
+                self._rank(film_id)
+            self.loaded = True
+            return len(delta)
+
+    def _merge_row(self, film_id, changes):
+        if not changes:
+            return
+        neighbours = self._neighbours.get(film_id, array('i'))
+        counts = self._counts.get(film_id, array('i'))
+        merged = dict(zip(neighbours, counts))
+        for other, count in changes.items():
+            merged[other] = merged.get(other, 0) + count
+        ordered = sorted(merged)
+        self._neighbours[film_id] = array('i', ordered)
+        self._counts[film_id] = array('i', (merged[other] for other in ordered))
+
+    def score(self, film_id, other, count):
+        # Cosine similarity over customer sets, so blockbusters don't dominate
+        return count / math.sqrt(self.film_customers.get(film_id, 1) * self.film_customers.get(other, 1))
+
+    def _rank(self, film_id):
+        neighbours = self._neighbours.get(film_id)
+        if not neighbours:
+            return
+        counts = self._counts[film_id]
+        self._top[film_id] = tuple(heapq.nlargest(
+            self.top_k,
+            ((self.score(film_id, other, count), count, other) for other, count in zip(neighbours, counts)),
+            key=lambda item: (item[0], item[1], -item[2])
+        ))
+
+    def similar(self, film_id, limit=10):
+        # Returns (film_id, score, co_rentals) tuples from the precomputed top-k
+        with self._lock:
+            return [(other, score, count) for score, count, other in self._top.get(film_id, ())[:limit]]
+
+    def recommend(self, customer_id, limit=10):
+        # Sums the top-k neighbours of every film the customer has rented
+        with self._lock:
+            films = self.customer_films.get(customer_id, ())
+            seen = set(films)
+            scores = {}
+            for film_id in films:
+                for score, _, other in self._top.get(film_id, ()):
+                    if other not in seen:
+                        scores[other] = scores.get(other, 0.0) + score
+        return heapq.nlargest(limit, scores.items(), key=lambda item: (item[1], -item[0]))
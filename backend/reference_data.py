@@ -0,0 +1,96 @@
+# Process-local cache of the small lookup tables (language, category, country, city, store)
+import threading
+import time
+from collections import namedtuple
+from types import MappingProxyType
+
+CityRecord = namedtuple('CityRecord', ['city_id', 'name', 'country_id'])
+StoreRecord = namedtuple('StoreRecord', ['store_id', 'manager_staff_id', 'address_id', 'city_id'])
+
+
+class ReferenceSnapshot:
+    """Read-only view of the lookup tables at one point in time."""
+
+    def __init__(self, languages, categories, countries, cities, stores):
+        self.languages = MappingProxyType(dict(languages))
+        self.categories = MappingProxyType(dict(categories))
+        self.countries = MappingProxyType(dict(countries))
+        self.cities = MappingProxyType({city.city_id: city for city in cities})
+        self.stores = MappingProxyType({store.store_id: store for store in stores})
+
+    def city_names(self, city_id):
+        city = self.cities.get(city_id)
+        if city is None:
+            return None, None
+        return city.name, self.countries.get(city.country_id)
+
+    def enrich_film(self, film):
+        if 'language_id' in film:
+            film['language'] = self.languages.get(film['language_id'])
+        if 'original_language_id' in film:
+            film['original_language'] = self.languages.get(film['original_language_id'])
+        return film
+
+    def enrich_address(self, address):
+        address['city'], address['country'] = self.city_names(address.get('city_id'))
+        return address
+
+    def enrich_customer(self, customer):
+        store = self.stores.get(customer.get('store_id'))
+        if store is not None:
+            customer['store_city'], customer['store_country'] = self.city_names(store.city_id)
+        return customer
+
+
+class ReferenceData:
+    """Loads the lookup tables once and swaps in a fresh snapshot when they change.
+
+    load_snapshot() reads every table; load_stamps() returns something cheap
+    (MAX(last_update) per table) that changes when a table does. Stamps are
+    compared every check_seconds and a full reload happens at least every
+    ttl_seconds regardless.
+    """
+
+    def __init__(self, load_snapshot, load_stamps, ttl_seconds=300, check_seconds=30):
+        self.load_snapshot = load_snapshot
+        self.load_stamps = load_stamps
+        self.ttl_seconds = ttl_seconds
+        self.check_seconds = check_seconds
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._stamps = None
+        self._loaded_at = 0.0
+        self._checked_at = 0.0
+
+    def invalidate(self):
+        with self._lock:
+            self._snapshot = None
+
+    def peek(self):
+        # The current snapshot if it is due neither a check nor a reload, else None
+        now = time.monotonic()
+        snapshot = self._snapshot
+        if snapshot is not None and now - self._checked_at < self.check_seconds and now - self._loaded_at < self.ttl_seconds:
+            return snapshot
+        return None
+
+    def get(self):
+        now = time.monotonic()
+        snapshot = self._snapshot
+        if snapshot is not None and now - self._checked_at < self.check_seconds and now - self._loaded_at < self.ttl_seconds:
+            return snapshot
+
+        with self._lock:
+            if self._snapshot is not None and now - self._loaded_at < self.ttl_seconds:
+                if now - self._checked_at < self.check_seconds:
+                    return self._snapshot
+                stamps = self.load_stamps()
+                self._checked_at = now
+                if stamps == self._stamps:
+                    return self._snapshot
+            else:
+                stamps = self.load_stamps()
+            self._snapshot = self.load_snapshot()
+            self._stamps = stamps
+            self._loaded_at = self._checked_at = now
+            return self._snapshot
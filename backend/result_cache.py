@@ -0,0 +1,319 @@
+# Response cache for GET views, invalidated by table versions
+import functools
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from flask import Response, jsonify, make_response, request
+
+from streaming import wants_stream
+
+
+class CacheStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts = {'hits': 0, 'misses': 0, 'stale': 0, 'evictions': 0, 'expirations': 0, 'invalidations': 0}
+
+    def add(self, name, count=1):
+        if count:
+            with self._lock:
+                self.counts[name] += count
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.counts)
+
+
+class LRUBackend:
+    """In-process LRU bounded by entry count and total body bytes, with a TTL.
+
+    Entries carry the tables they were built from; bump() drops every entry
+    tagged with a bumped table straight away.
+    """
+
+    def __init__(self, stats, max_entries=2048, max_bytes=64 * 1024 * 1024):
+        self.stats = stats
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._by_table = {}
+        self._versions = {}
+        self._bytes = 0
+
+    def _drop(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        self._bytes -= len(entry['body'])
+        for table in entry['tables']:
+            keys = self._by_table.get(table)
+            if keys is not None:
+                keys.discard(key)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry['expires'] <= time.time():
+                self._drop(key)
+                self.stats.add('expirations')
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key, entry):
+        if len(entry['body']) > self.max_bytes:
+            return
+        with self._lock:
+            self._drop(key)
+            self._entries[key] = entry
+            self._bytes += len(entry['body'])
+            for table in entry['tables']:
+                self._by_table.setdefault(table, set()).add(key)
+            evicted = 0
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+                evicted += 1
+            self.stats.add('evictions', evicted)
+
+    def delete(self, key):
+        with self._lock:
+            self._drop(key)
+
+    def versions(self, tables):
+        with self._lock:
+            return tuple(self._versions.get(table, 0) for table in tables)
+
+    def bump(self, tables):
+        with self._lock:
+            dropped = 0
+            for table in tables:
+                self._versions[table] = self._versions.get(table, 0) + 1
+                for key in list(self._by_table.pop(table, ())):
+                    self._drop(key)
+                    dropped += 1
+            self.stats.add('invalidations', dropped)
+
+    def size(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'bytes': self._bytes}
+
+
+class SQLiteBackend:
+    """Cache shared by the worker processes on one host, kept in a SQLite file.
+
+    Table versions live in the same file, so a write handled by one worker
+    invalidates what the others cached. Size limits are enforced by
+    dropping the least recently stored entries.
+    """
+
+    def __init__(self, stats, path, max_entries=2048, max_bytes=64 * 1024 * 1024):
+        self.stats = stats
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        with self._connect() as connection:
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS cache_entry ('
+                'key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, '
+                'expires REAL NOT NULL, stored REAL NOT NULL)'
+            )
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS cache_tag (table_name TEXT NOT NULL, key TEXT NOT NULL, '
+                'PRIMARY KEY (table_name, key))'
+            )
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS cache_version (table_name TEXT PRIMARY KEY, version INTEGER NOT NULL)'
+            )
+            connection.execute('CREATE INDEX IF NOT EXISTS cache_entry_stored ON cache_entry (stored)')
+            connection.execute('CREATE INDEX IF NOT EXISTS cache_tag_key ON cache_tag (key)')
+
+    def _connect(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self._local.connection = connection
+        return _Transaction(connection)
+
+    def get(self, key):
+        with self._connect() as connection:
+            row = connection.execute('SELECT value, expires FROM cache_entry WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                return None
+            if row[1] <= time.time():
+                self._delete(connection, [key])
+                self.stats.add('expirations')
+                return None
+            return json.loads(row[0])
+
+    def set(self, key, entry):
+        value = json.dumps(entry)
+        if len(value) > self.max_bytes:
+            return
+        with self._connect() as connection:
+            self._delete(connection, [key])
+            connection.execute(
+                'INSERT INTO cache_entry (key, value, size, expires, stored) VALUES (?, ?, ?, ?, ?)',
+                (key, value, len(value), entry['expires'], time.time())
+            )
+            connection.executemany(
+                'INSERT OR IGNORE INTO cache_tag (table_name, key) VALUES (?, ?)',
+                [(table, key) for table in entry['tables']]
+            )
+            count, size = connection.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache_entry').fetchone()
+            evicted = []
+            if count > self.max_entries or size > self.max_bytes:
+                for old_key, old_size in connection.execute('SELECT key, size FROM cache_entry ORDER BY stored'):
+                    if count <= self.max_entries and size <= self.max_bytes:
+                        break
+                    evicted.append(old_key)
+                    count -= 1
+                    size -= old_size
+                self._delete(connection, evicted)
+            self.stats.add('evictions', len(evicted))
+
+    def _delete(self, connection, keys):
+        for key in keys:
+            connection.execute('DELETE FROM cache_entry WHERE key = ?', (key,))
+            connection.execute('DELETE FROM cache_tag WHERE key = ?', (key,))
+
+    def delete(self, key):
+        with self._connect() as connection:
+            self._delete(connection, [key])
+
+    def versions(self, tables):
+        with self._connect() as connection:
+            versions = dict(connection.execute(
+                f"SELECT table_name, version FROM cache_version WHERE table_name IN ({','.join('?' * len(tables))})",
+                tables
+            ).fetchall()) if tables else {}
+        return tuple(versions.get(table, 0) for table in tables)
+
+    def bump(self, tables):
+        with self._connect() as connection:
+            dropped = 0
+            for table in tables:
+                connection.execute(
+                    'INSERT INTO cache_version (table_name, version) VALUES (?, 1) '
+                    'ON CONFLICT (table_name) DO UPDATE SET version = version + 1',
+                    (table,)
+                )
+                keys = [row[0] for row in connection.execute('SELECT key FROM cache_tag WHERE table_name = ?', (table,))]
+                self._delete(connection, keys)
+                dropped += len(keys)
+            self.stats.add('invalidations', dropped)
+
+    def size(self):
+        with self._connect() as connection:
+            count, size = connection.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache_entry').fetchone()
+        return {'entries': count, 'bytes': size}
+
+
+class _Transaction:
+    # BEGIN IMMEDIATE so concurrent workers serialize their writes cleanly
+    def __init__(self, connection):
+        self.connection = connection
+
+    def __enter__(self):
+        self.connection.execute('BEGIN IMMEDIATE')
+        return self.connection
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.connection.execute('ROLLBACK' if exc_type else 'COMMIT')
+
+
+class ResultCache:
+    """Caches whole GET responses keyed by path, arguments and Accept header.
+
+    Each entry is tagged with the tables its view reads and stored with a
+    version: the backend's per-table counters (bumped by every write
+    endpoint), the tables' MAX(last_update) / row count stamps from
+    TableVersions (so writes and deletes from other processes are noticed
+    too) and anything returned by the view's extra() callback. An entry
+    whose version no longer matches is never served.
+    """
+
+    def __init__(self, table_versions):
+        self.table_versions = table_versions
+        self.stats = CacheStats()
+        self.backend = None
+        self.enabled = False
+        self.ttl_seconds = 300
+        table_versions.on_bump(self.bump)
+
+    def init_app(self, app):
+        self.enabled = app.config.get('RESULT_CACHE_ENABLED', True)
+        self.ttl_seconds = app.config.get('RESULT_CACHE_TTL_SECONDS', self.ttl_seconds)
+        limits = {
+            'max_entries': app.config.get('RESULT_CACHE_MAX_ENTRIES', 2048),
+            'max_bytes': app.config.get('RESULT_CACHE_MAX_BYTES', 64 * 1024 * 1024),
+        }
+        shared_path = app.config.get('RESULT_CACHE_SHARED_PATH')
+        if shared_path:
+            self.backend = SQLiteBackend(self.stats, shared_path, **limits)
+        else:
+            self.backend = LRUBackend(self.stats, **limits)
+        app.add_url_rule('/cache/stats', 'cache_stats', self.stats_view, methods=['GET'])
+
+    def bump(self, *tables):
+        if self.backend is not None:
+            self.backend.bump(tables)
+
+    def _key(self):
+        args = '&'.join(f'{key}={value}' for key, value in sorted(request.args.items(multi=True)))
+        return f"{request.path}?{args}|{request.headers.get('Accept', '')}"
+
+    def _version(self, tables, extra):
+        stamps = self.table_versions.stamps(tables)
+        return json.dumps([
+            list(self.backend.versions(tables)),
+            [[stamp.isoformat() if stamp else None, count] for stamp, count in stamps],
+            extra() if extra else None,
+        ], default=str)
+
+    def cached(self, *tables, extra=None):
+        """Decorator caching a GET view's 200 responses; streamed ones are skipped."""
+        def decorator(view):
+            @functools.wraps(view)
+            def wrapper(*args, **kwargs):
+                if not self.enabled or self.backend is None or wants_stream():
+                    return view(*args, **kwargs)
+                key = self._key()
+                version = self._version(tables, extra)
+                entry = self.backend.get(key)
+                if entry is not None:
+                    if entry['version'] == version:
+                        self.stats.add('hits')
+                        return Response(entry['body'], status=entry['status'], headers=entry['headers'],
+                                        mimetype=entry['mimetype'])
+                    self.stats.add('stale')
+                    self.backend.delete(key)
+                self.stats.add('misses')
+
+                response = make_response(view(*args, **kwargs))
+                if response.status_code == 200 and not response.is_streamed:
+                    self.backend.set(key, {
+                        'version': version,
+                        'tables': list(tables),
+                        'expires': time.time() + self.ttl_seconds,
+                        'status': response.status_code,
+                        'mimetype': response.mimetype,
+                        'headers': [
+                            (name, value) for name, value in response.headers.items()
+                            if name not in ('Content-Type', 'Content-Length')
+                        ],
+                        'body': response.get_data(as_text=True),
+                    })
+                return response
+            return wrapper
+        return decorator
+
+    def stats_view(self):
+        return jsonify(dict(self.stats.snapshot(), **(self.backend.size() if self.backend else {})))
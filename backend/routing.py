@@ -0,0 +1,107 @@
+# Read/write splitting between the primary database and read replicas
+import contextlib
+import itertools
+import time
+
+from flask import current_app, g, has_request_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy.sql.dml import UpdateBase
+
+from config import REPLICA_BIND_PREFIX
+
+READ_METHODS = ('GET', 'HEAD')
+STICKY_COOKIE = 'sakila_primary_until'
+
+
+class ReplicaRouter:
+    """Decides whether a statement may be served by a replica.
+
+    Reads in a GET/HEAD request go to the replicas in turn. Everything else
+    goes to the primary: other methods, background threads, and any client
+    that wrote within the last sticky_seconds, tracked with a cookie set on
+    successful POST/PUT/PATCH/DELETE responses so it reads its own writes.
+    Routes decorated with read_only (e.g. POST /batch) count as reads: they
+    may use the replicas and never set the cookie.
+    """
+
+    def __init__(self):
+        self.db = None
+        self.sticky_seconds = 5
+        self._replicas = []
+        self._turn = itertools.count()
+
+    def init_app(self, app, db):
+        self.db = db
+        self.sticky_seconds = app.config.get('REPLICA_STICKY_SECONDS', self.sticky_seconds)
+        with app.app_context():
+            self._replicas = [
+                engine for key, engine in sorted(db.engines.items(), key=lambda item: str(item[0]))
+                if key is not None and key.startswith(REPLICA_BIND_PREFIX)
+            ]
+        app.after_request(self._after_request)
+
+    @property
+    def replicas(self):
+        return list(self._replicas)
+
+    @staticmethod
+    def read_only(view):
+        # For routes that need a body but never write; goes under @app.route
+        view.read_only = True
+        return view
+
+    def _reading(self):
+        if request.method in READ_METHODS:
+            return True
+        view = current_app.view_functions.get(request.endpoint)
+        return getattr(view, 'read_only', False)
+
+    def _sticky(self):
+        try:
+            return float(request.cookies.get(STICKY_COOKIE, 0)) > time.time()
+        except ValueError:
+            return False
+
+    def read_engine(self):
+        if not self._replicas or not has_request_context():
+            return None
+        if not self._reading() or g.get('read_primary') or self._sticky():
+            return None
+        return self._replicas[next(self._turn) % len(self._replicas)]
+
+    @contextlib.contextmanager
+    def primary(self):
+        # For GET paths that read state they are about to write back
+        previous = g.get('read_primary', False)
+        g.read_primary = True
+        try:
+            yield
+        finally:
+            g.read_primary = previous
+
+    def _after_request(self, response):
+        if self._replicas and not self._reading() and response.status_code < 400:
+            response.set_cookie(
+                STICKY_COOKIE, f'{time.time() + self.sticky_seconds:.3f}',
+                max_age=max(int(self.sticky_seconds + 0.999), 1), httponly=True, samesite='Lax'
+            )
+        return response
+
+
+class RoutingSession(Session):
+    """Session that asks the router for a replica before using the normal bind.
+
+    Flushes and INSERT/UPDATE/DELETE statements always use the primary, and
+    once a session has written, its later reads do too.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        router = self.info.get('router')
+        if bind is None and router is not None and not self.info.get('wrote'):
+            if self._flushing or isinstance(clause, UpdateBase):
+                self.info['wrote'] = True
+            else:
+                engine = router.read_engine()
+                if engine is not None:
+                    return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
@@ -0,0 +1,298 @@
+# In-memory trigram indexes for /search (films) and /search/customers
+import heapq
+import threading
+from bisect import bisect_left, insort
+
+# Higher weight wins when a film matches in more than one field
+FIELD_WEIGHTS = {'title': 3, 'actor': 2, 'category': 1}
+
+
+# Customer matches on name outrank matches on email
+CUSTOMER_FIELD_WEIGHTS = {'name': 2, 'email': 1}
+
+
+def trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def update_postings(postings, key, old_texts, new_texts):
+    old_grams = set().union(*(trigrams(text) for text in old_texts))
+    new_grams = set().union(*(trigrams(text) for text in new_texts))
+    for gram in old_grams - new_grams:
+        keys = postings.get(gram)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del postings[gram]
+    for gram in new_grams - old_grams:
+        postings.setdefault(gram, set()).add(key)
+
+
+def trigram_candidates(postings, term):
+    # Rarest trigram first so the candidate set shrinks quickly
+    grams = sorted(trigrams(term), key=lambda gram: len(postings.get(gram, ())))
+    candidates = None
+    for gram in grams:
+        keys = postings.get(gram)
+        if not keys:
+            return set()
+        candidates = set(keys) if candidates is None else candidates & keys
+        if not candidates:
+            return set()
+    return candidates
+
+
+def match_rank(texts, term):
+    # 2 exact, 1 prefix of the text or one of its words, 0 substring, None no match
+    best = None
+    for text in texts:
+        if term not in text:
+            continue
+        if text == term:
+            rank = 2
+        elif text.startswith(term) or f' {term}' in text:
+            rank = 1
+        else:
+            rank = 0
+        best = rank if best is None else max(best, rank)
+    return best
+
+
+class FilmSearchIndex:
+    """Substring and prefix search over films without touching the database.
+
+    Every field keeps a trigram -> film_id posting list. A query intersects
+    the postings of its trigrams and then verifies the candidates with a
+    plain substring check, so leading-wildcard matches cost a few set
+    operations instead of a table scan.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.films = {}
+        self.actor_names = {}
+        self.category_names = {}
+        self.film_actor_ids = {}
+        self.film_category_ids = {}
+        self.actor_film_ids = {}
+        self.category_film_ids = {}
+        self._texts = {field: {} for field in FIELD_WEIGHTS}
+        self._postings = {field: {} for field in FIELD_WEIGHTS}
+
+    def __len__(self):
+        return len(self.films)
+
+    def _set_texts(self, field, film_id, texts):
+        texts = tuple(sorted({text.lower() for text in texts if text}))
+        old = self._texts[field].get(film_id, ())
+        if old == texts:
+            return
+        update_postings(self._postings[field], film_id, old, texts)
+        if texts:
+            self._texts[field][film_id] = texts
+        else:
+            self._texts[field].pop(film_id, None)
+
+    def _reindex_actors(self, film_id):
+        names = [self.actor_names.get(actor_id) for actor_id in self.film_actor_ids.get(film_id, ())]
+        self._set_texts('actor', film_id, names)
+
+    def _reindex_categories(self, film_id):
+        names = [self.category_names.get(category_id) for category_id in self.film_category_ids.get(film_id, ())]
+        self._set_texts('category', film_id, names)
+
+    def upsert_film(self, film_id, title, payload):
+        with self._lock:
+            self.films[film_id] = payload
+            self._set_texts('title', film_id, [title])
+
+    def upsert_actor(self, actor_id, name):
+        with self._lock:
+            if self.actor_names.get(actor_id) == name:
+                return
+            self.actor_names[actor_id] = name
+            for film_id in self.actor_film_ids.get(actor_id, ()):
+                self._reindex_actors(film_id)
+
+    def upsert_category(self, category_id, name):
+        with self._lock:
+            if self.category_names.get(category_id) == name:
+                return
+            self.category_names[category_id] = name
+            for film_id in self.category_film_ids.get(category_id, ()):
+                self._reindex_categories(film_id)
+
+    def set_film_actors(self, film_id, actor_ids):
+        with self._lock:
+            for actor_id in self.film_actor_ids.get(film_id, ()):
+                self.actor_film_ids.get(actor_id, set()).discard(film_id)
+            self.film_actor_ids[film_id] = set(actor_ids)
+            for actor_id in actor_ids:
+                self.actor_film_ids.setdefault(actor_id, set()).add(film_id)
+            self._reindex_actors(film_id)
+
+    def set_film_categories(self, film_id, category_ids):
+        with self._lock:
+            for category_id in self.film_category_ids.get(film_id, ()):
+                self.category_film_ids.get(category_id, set()).discard(film_id)
+            self.film_category_ids[film_id] = set(category_ids)
+            for category_id in category_ids:
+                self.category_film_ids.setdefault(category_id, set()).add(film_id)
+            self._reindex_categories(film_id)
+
+    def _field_matches(self, field, term):
+        texts = self._texts[field]
+        if len(term) >= 3:
+            candidates = trigram_candidates(self._postings[field], term)
+        else:
+            # Too short for a trigram, so verify every indexed film directly
+            candidates = texts.keys()
+
+        matches = {}
+        for film_id in candidates:
+            rank = match_rank(texts.get(film_id, ()), term)
+            if rank is not None:
+                matches[film_id] = rank
+        return matches
+
+    def search(self, term, limit=None):
+        term = (term or '').strip().lower()
+        with self._lock:
+            if not term:
+                ordered = sorted(self.films.values(), key=lambda film: film['title'])
+                return [dict(film, match_field=None) for film in (ordered[:limit] if limit else ordered)]
+
+            scores = {}
+            for field, weight in FIELD_WEIGHTS.items():
+                for film_id, rank in self._field_matches(field, term).items():
+                    if film_id not in self.films:
+                        continue
+                    # Field weight dominates; exact and prefix matches break ties
+                    score = (weight, rank)
+                    if film_id not in scores or score > scores[film_id][0]:
+                        scores[film_id] = (score, field)
+
+            ranked = sorted(
+                scores.items(),
+                key=lambda item: (-item[1][0][0], -item[1][0][1], self.films[item[0]]['title'])
+            )
+            if limit:
+                ranked = ranked[:limit]
+            return [dict(self.films[film_id], match_field=field) for film_id, (_, field) in ranked]
+
+
+class CustomerSearchIndex:
+    """Name and email lookup for customers, returning summaries only.
+
+    Terms of three or more characters go through trigram postings like the
+    film index. Shorter terms only match as prefixes, answered by bisecting
+    a sorted list of (word, customer_id), so a one-letter keyword never
+    scans every customer. Rental counts are kept alongside each summary and
+    are bumped incrementally as new rentals are seen.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.customers = {}
+        self.rental_counts = {}
+        self.last_rental_id = 0
+        self._texts = {field: {} for field in CUSTOMER_FIELD_WEIGHTS}
+        self._postings = {field: {} for field in CUSTOMER_FIELD_WEIGHTS}
+        self._words = {field: [] for field in CUSTOMER_FIELD_WEIGHTS}
+
+    def __len__(self):
+        return len(self.customers)
+
+    def _set_texts(self, field, customer_id, texts):
+        texts = tuple(sorted({text.lower() for text in texts if text}))
+        old = self._texts[field].get(customer_id, ())
+        if old == texts:
+            return
+        update_postings(self._postings[field], customer_id, old, texts)
+        words = self._words[field]
+        old_words = {word for text in old for word in text.split()}
+        new_words = {word for text in texts for word in text.split()}
+        for word in old_words - new_words:
+            index = bisect_left(words, (word, customer_id))
+            if index < len(words) and words[index] == (word, customer_id):
+                del words[index]
+        for word in new_words - old_words:
+            insort(words, (word, customer_id))
+        if texts:
+            self._texts[field][customer_id] = texts
+        else:
+            self._texts[field].pop(customer_id, None)
+
+    def upsert(self, customer_id, summary):
+        with self._lock:
+            self.customers[customer_id] = summary
+            first, last = summary.get('first_name') or '', summary.get('last_name') or ''
+            self._set_texts('name', customer_id, [first, last, f'{first} {last}'.strip()])
+            self._set_texts('email', customer_id, [summary.get('email')])
+
+    def remove(self, customer_id):
+        with self._lock:
+            if self.customers.pop(customer_id, None) is None:
+                return
+            for field in CUSTOMER_FIELD_WEIGHTS:
+                self._set_texts(field, customer_id, [])
+
+    def add_rental_counts(self, counts, last_rental_id):
+        with self._lock:
+            for customer_id, count in counts.items():
+                self.rental_counts[customer_id] = self.rental_counts.get(customer_id, 0) + count
+            self.last_rental_id = max(self.last_rental_id, last_rental_id or 0)
+
+    def _prefix_matches(self, field, term):
+        words = self._words[field]
+        matches = {}
+        index = bisect_left(words, (term,))
+        while index < len(words) and words[index][0].startswith(term):
+            word, customer_id = words[index]
+            matches[customer_id] = max(matches.get(customer_id, 1), 2 if word == term else 1)
+            index += 1
+        return matches
+
+    def _field_matches(self, field, term):
+        if len(term) < 3:
+            return self._prefix_matches(field, term)
+        texts = self._texts[field]
+        matches = {}
+        for customer_id in trigram_candidates(self._postings[field], term):
+            rank = match_rank(texts.get(customer_id, ()), term)
+            if rank is not None:
+                matches[customer_id] = rank
+        return matches
+
+    def _result(self, customer_id, field):
+        return dict(
+            self.customers[customer_id],
+            rental_count=self.rental_counts.get(customer_id, 0),
+            match_field=field
+        )
+
+    def search(self, term, limit=20):
+        term = (term or '').strip().lower()
+        if not term:
+            return []
+        with self._lock:
+            scores = {}
+            # An all-digit keyword is also tried as a customer_id
+            if term.isdigit() and int(term) in self.customers:
+                scores[int(term)] = ((3, 2), 'customer_id')
+            for field, weight in CUSTOMER_FIELD_WEIGHTS.items():
+                for customer_id, rank in self._field_matches(field, term).items():
+                    if customer_id not in self.customers:
+                        continue
+                    score = (weight, rank)
+                    if customer_id not in scores or score > scores[customer_id][0]:
+                        scores[customer_id] = (score, field)
+
+            def order(item):
+                customer_id, (score, _) = item
+                customer = self.customers[customer_id]
+                return (-score[0], -score[1], (customer.get('last_name') or '').lower(),
+                        (customer.get('first_name') or '').lower(), customer_id)
+
+            ranked = heapq.nsmallest(limit, scores.items(), key=order)
+            return [self._result(customer_id, field) for customer_id, (_, field) in ranked]
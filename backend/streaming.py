@@ -0,0 +1,64 @@
+# Chunked JSON / NDJSON responses for endpoints that can return many rows
+from flask import Response, current_app, request, stream_with_context
+
+NDJSON_MIMETYPE = 'application/x-ndjson'
+# Envelope of the last NDJSON line holding the tail() fields, so it can't
+# be mistaken for an item
+NDJSON_META_KEY = '_meta'
+STREAM_BATCH_SIZE = 500
+STREAM_CHUNK_BYTES = 64 * 1024
+
+
+def wants_ndjson():
+    return request.accept_mimetypes.best_match(['application/json', NDJSON_MIMETYPE]) == NDJSON_MIMETYPE
+
+
+def wants_stream():
+    # ?stream=true asks for a streamed JSON body; NDJSON is always streamed
+    return wants_ndjson() or request.args.get('stream', '').lower() in ('1', 'true', 'yes')
+
+
+def stream_json(items, serialize, key=None, tail=None):
+    """Stream items as a JSON array, or as NDJSON if the client asked for it.
+
+    With key, the array is wrapped as {key: [...]} and the fields returned
+    by tail() are written after the array, once every item has been sent.
+    In NDJSON there is no wrapper, so the tail() fields (e.g. next_cursor)
+    come as one last line of their own, {"_meta": {...}}. Output is
+    buffered into chunks of roughly STREAM_CHUNK_BYTES.
+    """
+    dumps = current_app.json.dumps
+    ndjson = wants_ndjson()
+
+    def generate():
+        buffer = []
+        size = 0
+        if not ndjson:
+            buffer.append('{%s: [' % dumps(key) if key else '[')
+        first = True
+        for item in items:
+            if ndjson:
+                piece = dumps(serialize(item)) + '\n'
+            else:
+                piece = ('' if first else ',') + dumps(serialize(item))
+            first = False
+            buffer.append(piece)
+            size += len(piece)
+            if size >= STREAM_CHUNK_BYTES:
+                yield ''.join(buffer)
+                buffer = []
+                size = 0
+        if ndjson:
+            if key and tail:
+                buffer.append(dumps({NDJSON_META_KEY: tail()}) + '\n')
+        else:
+            buffer.append(']')
+            if key:
+                for name, value in (tail() if tail else {}).items():
+                    buffer.append(',%s: %s' % (dumps(name), dumps(value)))
+                buffer.append('}')
+        if buffer:
+            yield ''.join(buffer)
+
+    mimetype = NDJSON_MIMETYPE if ndjson else 'application/json'
+    return Response(stream_with_context(generate()), mimetype=mimetype)
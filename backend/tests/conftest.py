@@ -0,0 +1,52 @@
+# Shared fixtures: server.py loaded against a small generated SQLite dataset
+import contextlib
+import os
+import sys
+
+import pytest
+from sqlalchemy import event
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+from bench import load_server  # noqa: E402
+from bench.generate import generate  # noqa: E402
+
+
+@pytest.fixture(scope='session')
+def database_url(tmp_path_factory):
+    # server.py is imported once per test run, so every test shares this file
+    url = f"sqlite:///{tmp_path_factory.mktemp('sakila') / 'sakila.db'}"
+    generate(url, scale=0.02)
+    return url
+
+
+@pytest.fixture(scope='session')
+def server(database_url):
+    return load_server(database_url)
+
+
+@pytest.fixture
+def client(server):
+    return server.app.test_client()
+
+
+@pytest.fixture
+def count_statements(server):
+    """Context manager collecting the SQL statements sent while it is open."""
+    @contextlib.contextmanager
+    def counting():
+        statements = []
+
+        def listener(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        with server.app.app_context():
+            engine = server.db.engine
+        event.listen(engine, 'before_cursor_execute', listener)
+        try:
+            yield statements
+        finally:
+            event.remove(engine, 'before_cursor_execute', listener)
+    return counting
@@ -0,0 +1,26 @@
+import pytest
+
+
+@pytest.mark.parametrize('queued', [False, True])
+def test_both_paths_refuse_a_copy_that_is_out(server, client, monkeypatch, queued):
+    monkeypatch.setitem(server.app.config, 'RENTAL_WRITE_BEHIND', queued)
+    with server.app.app_context():
+        inventory_id = server.db.session.query(server.Rental.inventory_id).filter(
+            server.Rental.return_date.is_(None)).first()[0]
+
+    response = client.post('/add_rental', json={'inventory_id': inventory_id, 'customer_id': 1, 'staff_id': 1})
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'Inventory item is already rented'
+
+
+@pytest.mark.parametrize('body', [[{'inventory_id': 1, 'customer_id': 1, 'staff_id': 1}], 'text', None])
+def test_add_rental_needs_a_json_object(client, body):
+    response = client.post('/add_rental', json=body)
+    assert response.status_code == 400
+    assert 'JSON object' in response.get_json()['error']
+
+
+def test_add_rental_names_the_required_fields(client):
+    response = client.post('/add_rental', json={'inventory_id': 'x', 'customer_id': 1, 'staff_id': 1})
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'inventory_id, customer_id and staff_id are required'
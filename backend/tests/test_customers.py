@@ -0,0 +1,54 @@
+import json
+
+
+def test_page_numbers_and_total_match_the_frontend(server, client):
+    # App.js asks for ?page=N&limit=20&count=true and builds its page buttons from total
+    with server.app.app_context():
+        ids = [row[0] for row in server.db.session.query(server.Customer.customer_id).order_by(server.Customer.customer_id)]
+
+    first = client.get('/customers?page=1&limit=5&count=true').get_json()
+    second = client.get('/customers?page=2&limit=5&count=true').get_json()
+
+    assert first['total'] == second['total'] == len(ids)
+    assert [customer['customer_id'] for customer in first['customers']] == ids[:5]
+    assert [customer['customer_id'] for customer in second['customers']] == ids[5:10]
+
+
+def test_cursor_pages_cover_every_customer(server, client):
+    with server.app.app_context():
+        count = server.db.session.query(server.Customer).count()
+
+    seen = []
+    url = '/customers?limit=7'
+    while url:
+        body = client.get(url).get_json()
+        seen.extend(customer['customer_id'] for customer in body['customers'])
+        url = f"/customers?limit=7&cursor={body['next_cursor']}" if body['next_cursor'] else None
+
+    assert len(seen) == len(set(seen)) == count
+    assert seen == sorted(seen)
+
+
+def test_ndjson_pages_end_with_a_meta_line(server, client):
+    with server.app.app_context():
+        ids = [row[0] for row in server.db.session.query(server.Customer.customer_id).order_by(
+            server.Customer.customer_id).limit(4)]
+
+    response = client.get('/customers?limit=3&count=true', headers={'Accept': 'application/x-ndjson'})
+    assert response.mimetype == 'application/x-ndjson'
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+    *items, meta = lines
+    assert [item['customer_id'] for item in items] == ids[:3]
+    assert all('_meta' not in item for item in items)
+    assert set(meta) == {'_meta'}
+    assert meta['_meta']['total'] >= 4
+
+    after = client.get(f"/customers?limit=1&cursor={meta['_meta']['next_cursor']}").get_json()
+    assert after['customers'][0]['customer_id'] == ids[3]
+
+
+def test_ndjson_without_a_limit_has_no_next_cursor(client):
+    response = client.get('/customers', headers={'Accept': 'application/x-ndjson'})
+    meta = json.loads(response.get_data(as_text=True).splitlines()[-1])
+    assert meta == {'_meta': {'next_cursor': None}}
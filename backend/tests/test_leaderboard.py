@@ -0,0 +1,32 @@
+import pytest
+
+
+@pytest.fixture
+def fresh_leaderboard(server):
+    # Other tests may have skipped note_rentals, so recount before comparing
+    with server.app.app_context():
+        server.refresh_leaderboard()
+    return server
+
+
+def responses(server, client, monkeypatch, url):
+    """The in-memory answer, then the SQL answer with and without window functions."""
+    bodies = [client.get(url).get_json()]
+    monkeypatch.setitem(server.app.config, 'LEADERBOARD_ENABLED', False)
+    for window_functions in (True, False):
+        monkeypatch.setattr(server, 'supports_window_functions', lambda dialect=None: window_functions)
+        bodies.append(client.get(url).get_json())
+    return bodies
+
+
+@pytest.mark.parametrize('url', ['/top_actors', '/top_actors?actors=8&movies=3'])
+def test_top_actors_match_with_and_without_the_leaderboard(fresh_leaderboard, client, monkeypatch, url):
+    memory, windowed, fallback = responses(fresh_leaderboard, client, monkeypatch, url)
+    assert memory
+    assert memory == windowed == fallback
+
+
+def test_top_movies_match_with_and_without_the_leaderboard(fresh_leaderboard, client, monkeypatch):
+    memory, windowed, fallback = responses(fresh_leaderboard, client, monkeypatch, '/top_movies')
+    assert len(memory) == 5
+    assert memory == windowed == fallback
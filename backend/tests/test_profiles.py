@@ -0,0 +1,39 @@
+import pytest
+
+
+def customer_ids(server, count):
+    with server.app.app_context():
+        return [row[0] for row in server.db.session.query(server.Customer.customer_id).order_by(
+            server.Customer.customer_id).limit(count)]
+
+
+@pytest.mark.parametrize('window_functions', [True, False])
+@pytest.mark.parametrize('count', [1, 8])
+def test_profiles_take_four_queries(server, count_statements, monkeypatch, window_functions, count):
+    monkeypatch.setattr(server, 'supports_window_functions', lambda dialect=None: window_functions)
+    ids = customer_ids(server, count)
+    with server.app.app_context():
+        # The lookup table snapshot is cached per process, not part of the profile queries
+        server.reference_data.get()
+        with count_statements() as statements:
+            profiles = server.load_customer_profiles(ids, 5)
+
+    assert len(statements) == 4
+    assert sorted(profiles) == sorted(ids)
+    for profile in profiles.values():
+        assert profile['address']['country'] is not None
+        assert len(profile['recent_rentals']) <= 5
+        assert all(rental['title'] for rental in profile['recent_rentals'])
+
+
+def test_profiles_endpoint_keeps_order_and_reports_missing(server, client):
+    ids = customer_ids(server, 3)
+    response = client.get(f"/customers/profiles?ids={ids[2]},{ids[0]},999999")
+    assert response.status_code == 200
+    body = response.get_json()
+    assert [profile['customer_id'] for profile in body['profiles']] == [ids[2], ids[0]]
+    assert body['missing'] == [999999]
+
+
+def test_profile_not_found(client):
+    assert client.get('/customers/999999/profile').status_code == 404
@@ -0,0 +1,101 @@
+import json
+import subprocess
+import sys
+import textwrap
+import threading
+
+from sqlalchemy import func
+
+from conftest import BACKEND_DIR
+
+
+def film_with_free_copies(server, minimum=3):
+    """(film_id, store_id, free copy count) of a film with several copies on the shelf."""
+    with server.app.app_context():
+        session = server.db.session
+        out = session.query(server.Rental.inventory_id).filter(server.Rental.return_date.is_(None))
+        free = func.count(server.Inventory.inventory_id)
+        return session.query(server.Inventory.film_id, server.Inventory.store_id, free).filter(
+            server.Inventory.inventory_id.notin_(out)
+        ).group_by(server.Inventory.film_id, server.Inventory.store_id).having(free >= minimum).order_by(
+            free.desc(), server.Inventory.film_id
+        ).first()
+
+
+def open_rentals_per_copy(server, film_id, store_id):
+    with server.app.app_context():
+        session = server.db.session
+        return dict(session.query(server.Rental.inventory_id, func.count(server.Rental.rental_id)).join(
+            server.Inventory, server.Rental.inventory_id == server.Inventory.inventory_id
+        ).filter(
+            server.Inventory.film_id == film_id, server.Inventory.store_id == store_id,
+            server.Rental.return_date.is_(None)
+        ).group_by(server.Rental.inventory_id).all())
+
+
+def test_concurrent_requests_never_share_a_copy(server):
+    film_id, store_id, free = film_with_free_copies(server)
+    rental = {'film_id': film_id, 'store_id': store_id, 'customer_id': 1, 'staff_id': 1}
+    statuses = []
+    start = threading.Barrier(free + 3)
+
+    def rent():
+        client = server.app.test_client()
+        start.wait()
+        response = client.post('/rent_any', json=rental)
+        statuses.append((response.status_code, response.get_json().get('inventory_id')))
+
+    threads = [threading.Thread(target=rent) for _ in range(free + 3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    granted = [inventory_id for status, inventory_id in statuses if status == 201]
+    assert len(granted) == len(set(granted)) == free
+    assert sorted(status for status, _ in statuses).count(409) == 3
+    assert set(open_rentals_per_copy(server, film_id, store_id).values()) == {1}
+
+
+# Each worker process loads its own copy of the app, as separate gunicorn workers would
+WORKER = textwrap.dedent('''
+    import json
+    import sys
+    import threading
+
+    sys.path.insert(0, sys.argv[1])
+    from bench import load_server
+
+    server = load_server(sys.argv[2])
+    rental = json.loads(sys.argv[3])
+    codes = []
+
+    def rent():
+        codes.append(server.app.test_client().post('/rent_any', json=rental).status_code)
+
+    threads = [threading.Thread(target=rent) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    print(json.dumps(codes))
+''')
+
+
+def test_concurrent_processes_never_share_a_copy(server, database_url):
+    film_id, store_id, free = film_with_free_copies(server)
+    rental = json.dumps({'film_id': film_id, 'store_id': store_id, 'customer_id': 2, 'staff_id': 1})
+    workers = [
+        subprocess.Popen([sys.executable, '-c', WORKER, BACKEND_DIR, database_url, rental],
+                         stdout=subprocess.PIPE, text=True)
+        for _ in range(3)
+    ]
+    codes = []
+    for worker in workers:
+        output, _ = worker.communicate(timeout=120)
+        assert worker.returncode == 0
+        codes.extend(json.loads(output.strip().splitlines()[-1]))
+
+    assert codes.count(201) == min(free, len(codes))
+    assert set(codes) <= {201, 409}
+    assert set(open_rentals_per_copy(server, film_id, store_id).values()) == {1}
@@ -0,0 +1,44 @@
+import time
+from types import SimpleNamespace
+
+from sqlalchemy import create_engine, func, inspect, select
+
+from migrations import revenue_rollups
+
+
+def test_migration_creates_and_drops_the_rollup_tables(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'rollups.db'}")
+    names = [table.name for table in revenue_rollups.TABLES]
+
+    assert revenue_rollups.upgrade(engine) == names
+    assert set(inspect(engine).get_table_names()) == set(names)
+    with engine.connect() as conn:
+        assert conn.execute(select(revenue_rollups.rollup_state.c.name)).scalars().all() == ['payment']
+    assert revenue_rollups.upgrade(engine) == []
+    assert revenue_rollups.downgrade(engine) == names[::-1]
+    assert inspect(engine).get_table_names() == []
+
+
+def test_first_catch_up_runs_in_the_background(server, client):
+    response = client.get('/revenue/store?granularity=year')
+    assert response.status_code == 200
+    deadline = time.monotonic() + 10
+    while response.get_json()['catching_up'] and time.monotonic() < deadline:
+        time.sleep(0.05)
+        response = client.get('/revenue/store?granularity=year')
+    body = response.get_json()
+    assert not body['catching_up']
+
+    with server.app.app_context():
+        count, last_id = server.db.session.query(
+            func.count(server.Payment.payment_id), func.max(server.Payment.payment_id)).one()
+    assert body['as_of_payment_id'] == last_id
+    assert sum(row['payment_count'] for row in body['rows']) == count
+
+
+def test_missing_tables_are_reported(server, client, monkeypatch):
+    monkeypatch.setattr(server, 'revenue_tables_ready', False)
+    monkeypatch.setattr(server, 'inspect', lambda engine: SimpleNamespace(has_table=lambda name: False))
+    response = client.get('/revenue/store')
+    assert response.status_code == 503
+    assert 'migrations.revenue_rollups' in response.get_json()['error']
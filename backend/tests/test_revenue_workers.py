@@ -0,0 +1,60 @@
+import subprocess
+import sys
+import textwrap
+import time
+
+from sqlalchemy import column, create_engine, func, select, table
+
+from conftest import BACKEND_DIR
+
+# Each worker process loads its own copy of the app, as separate gunicorn
+# workers would, and they all start catching up at the same moment
+WORKER = textwrap.dedent('''
+    import os
+    import sys
+    import time
+
+    sys.path.insert(0, sys.argv[1])
+    from bench import load_server
+
+    server = load_server(sys.argv[2])
+    server.app.config['REVENUE_ROLLUP_CHUNK'] = 25
+    open(f'{sys.argv[3]}.{os.getpid()}.ready', 'w').close()
+    while not os.path.exists(sys.argv[3]):
+        time.sleep(0.005)
+    with server.app.app_context():
+        server.catch_up_revenue_rollups()
+''')
+
+
+def test_concurrent_workers_count_each_payment_once(tmp_path):
+    # A database of its own, since the shared one may already be caught up.
+    # Generated in a subprocess: bench.generate reuses an imported server module.
+    url = f"sqlite:///{tmp_path / 'revenue.db'}"
+    subprocess.run([sys.executable, '-m', 'bench.generate', '--url', url, '--scale', '0.02'],
+                   cwd=BACKEND_DIR, check=True, stdout=subprocess.DEVNULL)
+    start = tmp_path / 'start'
+    workers = [
+        subprocess.Popen([sys.executable, '-c', WORKER, BACKEND_DIR, url, str(start)])
+        for _ in range(4)
+    ]
+    deadline = time.monotonic() + 60
+    while len(list(tmp_path.glob('start.*.ready'))) < len(workers) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    start.touch()
+    for worker in workers:
+        assert worker.wait(timeout=120) == 0
+
+    payment = table('payment', column('payment_id'), column('amount'))
+    rollup = table('revenue_daily_staff', column('amount'), column('payment_count'))
+    state = table('revenue_rollup_state', column('name'), column('last_payment_id'))
+    with create_engine(url).connect() as conn:
+        count, total, last_id = conn.execute(select(
+            func.count(payment.c.payment_id), func.sum(payment.c.amount), func.max(payment.c.payment_id))).one()
+        folded, folded_total = conn.execute(select(func.sum(rollup.c.payment_count), func.sum(rollup.c.amount))).one()
+        watermark = conn.execute(select(state.c.last_payment_id).where(state.c.name == 'payment')).scalar()
+
+    assert count > 100
+    assert watermark == last_id
+    assert folded == count
+    assert round(float(folded_total), 2) == round(float(total), 2)
@@ -0,0 +1,104 @@
+import sqlite3
+import time
+
+import pytest
+from flask import Flask, jsonify, request
+from flask_sqlalchemy import SQLAlchemy
+
+from routing import STICKY_COOKIE, ReplicaRouter, RoutingSession
+
+STICKY_SECONDS = 0.3
+
+
+@pytest.fixture
+def routed(tmp_path):
+    """A small app wired like server.py, over a primary and a replica SQLite file.
+
+    The files start with different rows, so each response shows which
+    database served it.
+    """
+    paths = {}
+    for name in ('primary', 'replica'):
+        paths[name] = str(tmp_path / f'{name}.db')
+        with sqlite3.connect(paths[name]) as conn:
+            conn.execute('CREATE TABLE item (item_id INTEGER PRIMARY KEY, name TEXT)')
+            conn.execute('INSERT INTO item (name) VALUES (?)', (name,))
+
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{paths['primary']}"
+    app.config['SQLALCHEMY_BINDS'] = {'replica_0': f"sqlite:///{paths['replica']}"}
+    app.config['REPLICA_STICKY_SECONDS'] = STICKY_SECONDS
+    router = ReplicaRouter()
+    db = SQLAlchemy(app, session_options={'class_': RoutingSession, 'info': {'router': router}})
+    router.init_app(app, db)
+
+    class Item(db.Model):
+        __tablename__ = 'item'
+        item_id = db.Column(db.Integer, primary_key=True)
+        name = db.Column(db.String(45))
+
+    def names():
+        return jsonify([item.name for item in Item.query.order_by(Item.item_id)])
+
+    @app.route('/items', methods=['GET'])
+    def list_items():
+        return names()
+
+    @app.route('/items', methods=['POST'])
+    def add_item():
+        db.session.add(Item(name=request.json['name']))
+        db.session.commit()
+        return names(), 201
+
+    @app.route('/items/lookup', methods=['POST'])
+    @router.read_only
+    def lookup_items():
+        return names()
+
+    def rows(name):
+        with sqlite3.connect(paths[name]) as conn:
+            return [row[0] for row in conn.execute('SELECT name FROM item ORDER BY item_id')]
+
+    return app, rows
+
+
+def test_reads_go_to_the_replica(routed):
+    app, _ = routed
+    response = app.test_client().get('/items')
+    assert response.get_json() == ['replica']
+    assert STICKY_COOKIE not in response.headers.get('Set-Cookie', '')
+
+
+def test_writes_go_to_the_primary_and_their_reads_follow(routed):
+    app, rows = routed
+    response = app.test_client().post('/items', json={'name': 'new'})
+    assert response.status_code == 201
+    # Once the session has written, the rest of the request reads the primary too
+    assert response.get_json() == ['primary', 'new']
+    assert rows('primary') == ['primary', 'new']
+    assert rows('replica') == ['replica']
+
+
+def test_writer_reads_the_primary_until_the_sticky_window_ends(routed):
+    app, _ = routed
+    client = app.test_client()
+    response = client.post('/items', json={'name': 'new'})
+    assert STICKY_COOKIE in response.headers['Set-Cookie']
+
+    assert client.get('/items').get_json() == ['primary', 'new']
+    # Another client without the cookie still reads the replica
+    assert app.test_client().get('/items').get_json() == ['replica']
+
+    time.sleep(STICKY_SECONDS + 0.1)
+    assert client.get('/items').get_json() == ['replica']
+
+
+def test_read_only_post_uses_the_replica_and_sets_no_cookie(routed):
+    app, _ = routed
+    response = app.test_client().post('/items/lookup', json={})
+    assert response.get_json() == ['replica']
+    assert 'Set-Cookie' not in response.headers
+
+
+def test_batch_is_read_only(server):
+    assert server.app.view_functions['batch_requests'].read_only
@@ -0,0 +1,24 @@
+import json
+
+import pytest
+
+
+@pytest.mark.parametrize('extra_args, headers', [
+    ({'stream': 'true'}, {}),
+    ({}, {'Accept': 'application/x-ndjson'}),
+])
+def test_customer_search_streams_the_same_results(server, client, extra_args, headers):
+    with server.app.app_context():
+        keyword = server.db.session.query(server.Customer.last_name).order_by(server.Customer.customer_id).first()[0]
+    expected = client.get('/search/customers', query_string={'keyword': keyword}).get_json()
+    assert expected
+
+    response = client.get('/search/customers', query_string=dict(extra_args, keyword=keyword), headers=headers)
+    assert response.status_code == 200
+    assert response.is_streamed
+    body = response.get_data(as_text=True)
+    if response.mimetype == 'application/x-ndjson':
+        streamed = [json.loads(line) for line in body.splitlines()]
+    else:
+        streamed = json.loads(body)
+    assert streamed == expected
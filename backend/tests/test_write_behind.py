@@ -0,0 +1,121 @@
+import threading
+import time
+
+import pytest
+
+from write_behind import KeyPending, WriteBehindQueue
+
+
+def wait_for(queue, provisional_id, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        status = queue.status(provisional_id)
+        if status['status'] != 'queued':
+            return status
+        time.sleep(0.01)
+    raise AssertionError(f'{provisional_id} still queued')
+
+
+def test_on_commit_failure_does_not_retry_the_group():
+    flushed = []
+    committed = threading.Event()
+
+    def flush(rows):
+        flushed.append(list(rows))
+        return [row['n'] * 10 for row in rows]
+
+    def on_commit(rows):
+        committed.set()
+        raise RuntimeError('bookkeeping failed')
+
+    queue = WriteBehindQueue(flush, on_commit=on_commit, flush_seconds=0.2)
+    try:
+        ids = [queue.submit({'n': n}) for n in (1, 2, 3)]
+        statuses = [wait_for(queue, provisional_id) for provisional_id in ids]
+        assert committed.wait(5)
+    finally:
+        queue.shutdown()
+
+    assert flushed == [[{'n': 1}, {'n': 2}, {'n': 3}]]
+    assert [status['status'] for status in statuses] == ['committed'] * 3
+    assert [status['rental_id'] for status in statuses] == [10, 20, 30]
+
+
+def test_failed_group_is_retried_row_by_row():
+    def flush(rows):
+        if any(row['n'] == 2 for row in rows):
+            raise ValueError('bad row')
+        return [row['n'] for row in rows]
+
+    queue = WriteBehindQueue(flush, flush_seconds=0.2)
+    try:
+        ids = [queue.submit({'n': n}) for n in (1, 2, 3)]
+        statuses = [wait_for(queue, provisional_id) for provisional_id in ids]
+    finally:
+        queue.shutdown()
+
+    assert [status['status'] for status in statuses] == ['committed', 'failed', 'committed']
+
+
+def test_key_is_refused_while_queued():
+    release = threading.Event()
+
+    def flush(rows):
+        release.wait(5)
+        return [None] * len(rows)
+
+    queue = WriteBehindQueue(flush, key=lambda row: row['n'], flush_seconds=0)
+    try:
+        provisional_id = queue.submit({'n': 1})
+        with pytest.raises(KeyPending):
+            queue.submit({'n': 1})
+        queue.submit({'n': 2})
+        release.set()
+        wait_for(queue, provisional_id)
+        assert not queue.is_pending(1)
+        queue.submit({'n': 1})
+    finally:
+        release.set()
+        queue.shutdown()
+
+
+@pytest.fixture
+def write_behind(server, monkeypatch):
+    monkeypatch.setitem(server.app.config, 'RENTAL_WRITE_BEHIND', True)
+    return server
+
+
+def free_copy(server):
+    with server.app.app_context():
+        session = server.db.session
+        out = session.query(server.Rental.inventory_id).filter(server.Rental.return_date.is_(None))
+        return session.query(server.Inventory.inventory_id).filter(
+            server.Inventory.inventory_id.notin_(out)).order_by(server.Inventory.inventory_id.desc()).first()[0]
+
+
+def test_queued_rental_is_validated_first(write_behind, client):
+    response = client.post('/add_rental', json={'inventory_id': 999999, 'customer_id': 1, 'staff_id': 1})
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'Inventory item not found'
+
+
+def test_queued_rental_commits_once(write_behind, client, monkeypatch):
+    server = write_behind
+    monkeypatch.setattr(server, 'note_rentals', lambda inventory_ids: 1 / 0)
+    inventory_id = free_copy(server)
+    rental = {'inventory_id': inventory_id, 'customer_id': 1, 'staff_id': 1}
+
+    response = client.post('/add_rental', json=rental)
+    assert response.status_code == 202
+    provisional_id = response.get_json()['provisional_id']
+    status = wait_for(server.rental_write_behind, provisional_id)
+    assert status['status'] == 'committed'
+    assert isinstance(status['rental_id'], int)
+
+    with server.app.app_context():
+        assert server.db.session.query(server.Rental).filter_by(
+            inventory_id=inventory_id, return_date=None).count() == 1
+
+    response = client.post('/add_rental', json=rental)
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'Inventory item is already rented'
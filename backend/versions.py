@@ -0,0 +1,116 @@
+# Per-table versions for conditional GET (ETag / Last-Modified)
+import functools
+import hashlib
+import threading
+import time
+from datetime import datetime, timezone
+
+from flask import make_response, request
+
+
+class TableVersions:
+    """Cheap change tokens for the tables a read endpoint depends on.
+
+    Each table's token is what load_stamp(table) returns, a
+    (MAX(last_update), row count or None) pair re-read at most every
+    recheck_seconds, plus a local counter that write endpoints bump. The
+    count is for tables rows get deleted from, since a delete leaves
+    MAX(last_update) alone. A request whose validators still match is
+    answered with 304 before the view runs, so no query work is done for it.
+    """
+
+    def __init__(self, load_stamp, recheck_seconds=5):
+        self.load_stamp = load_stamp
+        self.recheck_seconds = recheck_seconds
+        self._lock = threading.Lock()
+        self._stamps = {}
+        self._checked = {}
+        self._counters = {}
+        self._bumped = {}
+        self._listeners = []
+
+    def on_bump(self, listener):
+        # listener(*tables) is called after every bump, e.g. to drop cached results
+        self._listeners.append(listener)
+
+    def bump(self, *tables):
+        now = datetime.now(timezone.utc)
+        with self._lock:
+            for table in tables:
+                self._counters[table] = self._counters.get(table, 0) + 1
+                self._bumped[table] = now
+        for listener in self._listeners:
+            listener(*tables)
+
+    def _stamp(self, table):
+        # The database check picks up writes made by other processes
+        now = time.monotonic()
+        if now - self._checked.get(table, float('-inf')) >= self.recheck_seconds:
+            stamp, count = self.load_stamp(table)
+            if stamp is not None:
+                # last_update is written as naive local time (datetime.now(),
+                # CURRENT_TIMESTAMP); convert it to the UTC clock bump() uses
+                stamp = stamp.astimezone(timezone.utc)
+            with self._lock:
+                previous = self._stamps.get(table)
+                if previous is not None and previous[1] != count:
+                    # A delete moves no last_update, so it is dated from when it was noticed
+                    self._bumped[table] = datetime.now(timezone.utc)
+                self._stamps[table] = (stamp, count)
+                self._checked[table] = now
+        return self._stamps.get(table, (None, None))
+
+    def stamps(self, tables):
+        # (last_update, count) per table
+        return tuple(self._stamp(table) for table in tables)
+
+    def state(self, tables):
+        parts = []
+        last_modified = None
+        for table in tables:
+            stamp, count = self._stamp(table)
+            with self._lock:
+                counter = self._counters.get(table, 0)
+                bumped = self._bumped.get(table)
+            parts.append(f"{table}:{stamp.isoformat() if stamp else '-'}:{'-' if count is None else count}:{counter}")
+            for candidate in (stamp, bumped):
+                if candidate is not None and (last_modified is None or candidate > last_modified):
+                    last_modified = candidate
+        return '|'.join(parts), last_modified
+
+    def conditional(self, *tables):
+        """Decorator adding ETag/Last-Modified and 304 handling to a GET view."""
+        def decorator(view):
+            @functools.wraps(view)
+            def wrapper(*args, **kwargs):
+                state, last_modified = self.state(tables)
+                material = '\n'.join([
+                    request.path,
+                    '&'.join(f'{key}={value}' for key, value in sorted(request.args.items(multi=True))),
+                    request.headers.get('Accept', ''),
+                    state,
+                ])
+                etag = hashlib.sha1(material.encode()).hexdigest()
+                if last_modified is not None:
+                    last_modified = last_modified.replace(microsecond=0)
+
+                not_modified = False
+                if request.if_none_match:
+                    not_modified = request.if_none_match.contains_weak(etag)
+                elif request.if_modified_since and last_modified is not None:
+                    not_modified = last_modified <= request.if_modified_since
+
+                if not_modified:
+                    response = make_response('', 304)
+                else:
+                    response = make_response(view(*args, **kwargs))
+                    if response.status_code != 200:
+                        return response
+                response.set_etag(etag)
+                if last_modified is not None:
+                    response.last_modified = last_modified
+                response.headers['Cache-Control'] = 'no-cache'
+                response.vary.add('Accept')
+                return response
+            return wrapper
+        return decorator
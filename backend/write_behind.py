@@ -0,0 +1,156 @@
+# Write-behind queue that group-commits rental inserts from a background thread
+import itertools
+import logging
+import queue
+import threading
+import time
+from collections import OrderedDict
+
+log = logging.getLogger('sakila.write_behind')
+
+
+class QueueClosed(Exception):
+    pass
+
+
+class KeyPending(Exception):
+    pass
+
+
+class WriteBehindQueue:
+    """Bounded queue of pending rows flushed in groups by one worker thread.
+
+    submit() returns a provisional id right away, or raises queue.Full when
+    the queue is at capacity so callers can push back on the client. The
+    worker collects up to batch_size rows or waits flush_seconds after the
+    first one, then calls flush(rows), which must insert them in a single
+    transaction and return their ids once it has committed. If a group
+    fails, its rows are retried one at a time so a single bad row doesn't
+    sink the others. on_commit(rows) runs after a successful flush, outside
+    that retry: the rows are already committed, so its errors are only
+    logged. With key(row), a row whose key is still queued is refused with
+    KeyPending.
+    """
+
+    def __init__(self, flush, on_commit=None, key=None, max_queue=10000, batch_size=200, flush_seconds=0.05,
+                 keep_statuses=100000):
+        self.flush = flush
+        self.on_commit = on_commit
+        self.key = key
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.keep_statuses = keep_statuses
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._ids = itertools.count(1)
+        self._statuses = OrderedDict()
+        self._pending_keys = set()
+        self._lock = threading.Lock()
+        self._worker = None
+        self._closed = False
+
+    def _start(self):
+        with self._lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, daemon=True, name='rental-write-behind')
+                self._worker.start()
+
+    def _set_status(self, provisional_id, **status):
+        with self._lock:
+            self._statuses[provisional_id] = status
+            self._statuses.move_to_end(provisional_id)
+            while len(self._statuses) > self.keep_statuses:
+                self._statuses.popitem(last=False)
+
+    def submit(self, row):
+        if self._closed:
+            raise QueueClosed()
+        self._start()
+        key = self.key(row) if self.key else None
+        if key is not None:
+            with self._lock:
+                if key in self._pending_keys:
+                    raise KeyPending(key)
+                self._pending_keys.add(key)
+        provisional_id = f'p{next(self._ids)}'
+        self._set_status(provisional_id, status='queued')
+        try:
+            self._queue.put_nowait((provisional_id, row))
+        except queue.Full:
+            with self._lock:
+                self._statuses.pop(provisional_id, None)
+                self._pending_keys.discard(key)
+            raise
+        return provisional_id
+
+    def is_pending(self, key):
+        with self._lock:
+            return key in self._pending_keys
+
+    def _release(self, batch):
+        if self.key:
+            with self._lock:
+                for _, row in batch:
+                    self._pending_keys.discard(self.key(row))
+
+    def status(self, provisional_id):
+        with self._lock:
+            return self._statuses.get(provisional_id)
+
+    def pending(self):
+        return self._queue.qsize()
+
+    def _collect(self):
+        try:
+            batch = [self._queue.get(timeout=0.5)]
+        except queue.Empty:
+            return []
+        deadline = time.monotonic() + self.flush_seconds
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining > 0:
+                    batch.append(self._queue.get(timeout=remaining))
+                else:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _commit(self, batch):
+        rows = [row for _, row in batch]
+        try:
+            ids = self.flush(rows)
+        except Exception as e:
+            if len(batch) == 1:
+                self._set_status(batch[0][0], status='failed', error=str(e))
+                self._release(batch)
+                return
+            for item in batch:
+                self._commit([item])
+            return
+        for (provisional_id, _), rental_id in zip(batch, ids):
+            self._set_status(provisional_id, status='committed', rental_id=rental_id)
+        self._release(batch)
+        if self.on_commit is not None:
+            try:
+                self.on_commit(rows)
+            except Exception:
+                log.exception('on_commit failed for %d committed rows', len(rows))
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            if batch:
+                try:
+                    self._commit(batch)
+                finally:
+                    for _ in batch:
+                        self._queue.task_done()
+            elif self._closed:
+                return
+
+    def shutdown(self, timeout=30):
+        # Stop taking new rows and wait for everything queued to be committed
+        self._closed = True
+        if self._worker is not None:
+            self._worker.join(timeout)